@@ -1,56 +1,662 @@
 #!/usr/bin/env python3
 """Simple HTTP server that writes incoming JSON events to a file."""
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import http.client
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import json
+import mmap
+import os
+import queue
+import re
+import signal
+import socket
+import sys
+import threading
+import time
+import zlib
 from datetime import datetime
 
-# Increase max headers limit (default is 100)
-http.client._MAXHEADERS = 1000
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 OUTPUT_FILE = "/app/output/events.json"
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonlines')
+# fast: respond once events are queued; durable: respond once they are fsynced
+DURABILITY = os.environ.get('DURABILITY', 'fast')
+# Group-commit interval: the journal fsyncs at most this often
+GROUP_COMMIT_MS = int(os.environ.get('GROUP_COMMIT_MS', '10'))
+WRITE_BUFFER_BYTES = 1024 * 1024
+# append: grow OUTPUT_FILE; mmap: write into preallocated, memory-mapped segment files
+OUTPUT_MODE = os.environ.get('OUTPUT_MODE', 'append')
+SEGMENT_BYTES = int(os.environ.get('SEGMENT_BYTES', str(64 * 1024 * 1024)))
+# Log at most one summary line (with a sample event) per interval
+LOG_INTERVAL = float(os.environ.get('LOG_INTERVAL', '10'))
+# Upper bound on a decompressed request body, and on a compressed body stored as received
+MAX_BODY_BYTES = int(os.environ.get('MAX_BODY_BYTES', str(256 * 1024 * 1024)))
+# Append gzip/zstd bodies as received to OUTPUT_FILE.gz / .zst instead of
+# inflating and normalizing them
+STORE_COMPRESSED = os.environ.get('STORE_COMPRESSED', 'false').lower() == 'true'
+READ_CHUNK_BYTES = 64 * 1024
 
-class FileWriterHandler(BaseHTTPRequestHandler):
-    # Disable keep-alive to prevent header accumulation bug
-    protocol_version = "HTTP/1.0"
+class Counter:
+    """Prometheus counter, optionally with one label."""
 
-    def do_POST(self):
+    def __init__(self, name, help, label=None):
+        self.name, self.help, self.label = name, help, label
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, label_value=None):
+        with self.lock:
+            self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for label_value, value in sorted(self.values.items(), key=lambda item: str(item[0])):
+                labels = f'{{{self.label}="{label_value}"}}' if self.label else ''
+                lines.append(f"{self.name}{labels} {value}")
+        return lines
+
+class Histogram:
+    """Prometheus histogram with fixed buckets."""
+
+    def __init__(self, name, help, buckets):
+        self.name, self.help, self.buckets = name, help, buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            cumulative = 0
+            for bound, count in zip(self.buckets, self.counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+            lines.append(f"{self.name}_sum {self.sum}")
+            lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+REQUESTS = Counter('file_writer_requests_total', 'POST requests handled', 'code')
+EVENTS = Counter('file_writer_events_total', 'Events accepted')
+BYTES_WRITTEN = Counter('file_writer_bytes_written_total', 'Bytes written to the output')
+REQUEST_DURATION = Histogram('file_writer_request_duration_seconds', 'POST handling time, including durable waits and errors',
+                             LATENCY_BUCKETS)
+WRITE_DURATION = Histogram('file_writer_write_duration_seconds', 'Time to write one coalesced group to the output',
+                           LATENCY_BUCKETS)
+SYNC_DURATION = Histogram('file_writer_sync_duration_seconds', 'Time to fsync the output', LATENCY_BUCKETS)
+COMPRESSED_BYTES = Counter('file_writer_compressed_bytes_received_total', 'Compressed request body bytes received',
+                           'encoding')
+
+def render_metrics():
+    lines = []
+    for metric in (REQUESTS, EVENTS, BYTES_WRITTEN, COMPRESSED_BYTES, REQUEST_DURATION, WRITE_DURATION,
+                   SYNC_DURATION):
+        lines.extend(metric.render())
+    lines.append("# HELP file_writer_queue_depth Requests queued for the journal writer")
+    lines.append("# TYPE file_writer_queue_depth gauge")
+    lines.append(f"file_writer_queue_depth {journal.queue.qsize() if journal is not None else 0}")
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+class SampledLog:
+    """Rate-limited logging: one summary line per LOG_INTERVAL with a sample event."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = 0
+        self.last = time.monotonic()
+
+    def received(self, count, sample):
+        with self.lock:
+            self.events += count
+            now = time.monotonic()
+            if now - self.last < LOG_INTERVAL:
+                return
+            events, elapsed = self.events, now - self.last
+            self.events = 0
+            self.last = now
+        print(f"[{datetime.now().isoformat()}] Received {events} events in {elapsed:.0f}s "
+              f"({events / elapsed:.1f}/sec), sample: {sample[:100]}...")
+
+sampled_log = SampledLog()
+
+class BadRequest(Exception):
+    """Malformed request framing; the connection cannot be reused."""
+
+class RequestError(Exception):
+    """Request the server refuses; the body has been read in full."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+ENCODING_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+def content_encoding(headers):
+    """Return the body's Content-Encoding, or None for an uncompressed body."""
+    encoding = headers.get('Content-Encoding', '').strip().lower()
+    if encoding in ('', 'identity'):
+        return None
+    if encoding == 'x-gzip':
+        encoding = 'gzip'
+    if encoding not in ENCODING_SUFFIXES:
+        raise RequestError(415, f"unsupported Content-Encoding: {encoding}")
+    if encoding == 'zstd' and zstandard is None:
+        raise RequestError(415, "zstd Content-Encoding requires the zstandard package")
+    return encoding
+
+def _decompressobj(encoding):
+    if encoding == 'gzip':
+        return zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    return zstandard.ZstdDecompressor().decompressobj()
+
+def decompress_chunks(chunks, encoding, keep=True):
+    """Inflate a body as it is read, returning the decompressed bytes.
+
+    Concatenated gzip members and zstd frames are decoded in turn, so a
+    client may compress each batch separately and stream them in one
+    body. Output beyond MAX_BODY_BYTES is rejected. With keep=False the
+    output is discarded and only the framing is checked.
+    """
+    decompressor = _decompressobj(encoding)
+    out = []
+    size = 0
+    in_frame = False
+    for chunk in chunks:
+        while chunk:
+            in_frame = True
+            try:
+                data = decompressor.decompress(chunk)
+            except (zlib.error, getattr(zstandard, 'ZstdError', zlib.error)) as e:
+                raise RequestError(400, f"invalid {encoding} body: {e}")
+            if keep:
+                size += len(data)
+                if size > MAX_BODY_BYTES:
+                    raise RequestError(413, f"decompressed body exceeds {MAX_BODY_BYTES} bytes")
+                out.append(data)
+            if decompressor.eof:
+                chunk = decompressor.unused_data
+                decompressor = _decompressobj(encoding)
+                in_frame = False
+            else:
+                chunk = b''
+    if in_frame:
+        raise RequestError(400, f"truncated {encoding} body")
+    return b''.join(out)
+
+def format_line(raw):
+    """Normalize one JSON event to a single line, or keep it as-is if not JSON."""
+    try:
+        return json.dumps(json.loads(raw))
+    except ValueError:
+        return raw.decode('utf-8', errors='replace')
+
+def parse_events(body, content_type):
+    """Split a request body into output lines, one per event.
+
+    NDJSON bodies carry one event per line and a JSON array body is a
+    batch of events; anything else is a single event.
+    """
+    if content_type.split(';', 1)[0].strip().lower() in NDJSON_TYPES:
+        return [format_line(raw) for raw in body.splitlines() if raw.strip()]
+    try:
+        data = json.loads(body)
+    except ValueError:
+        # If not JSON, write raw
+        return [body.decode('utf-8', errors='replace')]
+    if isinstance(data, list):
+        return [json.dumps(event) for event in data]
+    return [json.dumps(data)]
+
+class AppendOutput:
+    """Append-only output file."""
+
+    def __init__(self, path):
+        self.file = open(path, 'ab', buffering=WRITE_BUFFER_BYTES)
+
+    def write(self, data):
+        self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+class MmapSegmentOutput:
+    """Output written through mmap into preallocated fixed-size segments.
+
+    Segments are <stem>.<seq><ext> files of SEGMENT_BYTES, allocated up
+    front so appends never extend the file. When a write does not fit,
+    the segment is truncated to its valid length and the next one is
+    started; the open segment is truncated the same way on clean
+    shutdown. <stem>.index.jsonl logs the valid length of the open
+    segment at every sync, one appended line each, and is compacted to
+    one line per segment when a segment is closed. After a crash it is
+    used to cut back a segment's zero-filled tail. Sequence numbers
+    continue after the highest segment file on disk; an existing file is
+    never truncated or reused.
+    """
+
+    def __init__(self, path):
+        self.dir = os.path.dirname(path) or '.'
+        self.stem, self.ext = os.path.splitext(os.path.basename(path))
+        self.index_path = os.path.join(self.dir, f"{self.stem}.index.jsonl")
+        self.index = None
+        self.segments = self._load_index()
+        self._recover()
+        self.seq = max(self._segment_seqs(), default=0)
+        self.mm = None
+
+    def _load_index(self):
+        segments = {}
+        try:
+            with open(self.index_path) as f:
+                for line in f:
+                    try:
+                        segment = json.loads(line)
+                    except ValueError:
+                        # Last line cut short by a crash
+                        continue
+                    segments[segment["name"]] = segment
+        except FileNotFoundError:
+            pass
+        return segments
+
+    def _segment_seqs(self):
+        pattern = re.compile(re.escape(self.stem) + r'\.(\d+)' + re.escape(self.ext) + '$')
+        seqs = [int(m.group(1)) for m in map(pattern.match, os.listdir(self.dir)) if m]
+        return seqs + [segment["seq"] for segment in self.segments.values()]
+
+    def _recover(self):
+        # Segments left open by a crash keep only what the index says is valid
+        for segment in self.segments.values():
+            if not segment["closed"]:
+                path = os.path.join(self.dir, segment["name"])
+                if os.path.exists(path):
+                    with open(path, 'r+b') as f:
+                        f.truncate(segment["length"])
+                        os.fsync(f.fileno())
+                segment["closed"] = True
+        self._compact_index()
+
+    def _sync_dir(self):
+        fd = os.open(self.dir, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _open(self, size):
+        while True:
+            self.seq += 1
+            name = f"{self.stem}.{self.seq:06d}{self.ext}"
+            try:
+                self.fd = os.open(os.path.join(self.dir, name), os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+                break
+            except FileExistsError:
+                continue
+        try:
+            os.posix_fallocate(self.fd, 0, size)
+        except (AttributeError, OSError):
+            os.ftruncate(self.fd, size)
+        self.mm = mmap.mmap(self.fd, size)
+        self.pos = 0
+        self.segment = {"seq": self.seq, "name": name, "length": 0, "closed": False}
+        self.segments[name] = self.segment
+        # The new segment's directory entry must survive a crash with the index line
+        self._sync_dir()
+        self._append_index()
+
+    def _close_segment(self):
+        self.mm.flush()
+        self.mm.close()
+        self.mm = None
+        os.ftruncate(self.fd, self.pos)
+        os.fsync(self.fd)
+        os.close(self.fd)
+        self.segment["length"] = self.pos
+        self.segment["closed"] = True
+        self._compact_index()
+
+    def _append_index(self):
+        self.index.write(json.dumps(self.segment) + '\n')
+        self.index.flush()
+        os.fsync(self.index.fileno())
+
+    def _compact_index(self):
+        """Rewrite the index as one line per segment."""
+        if self.index is not None:
+            self.index.close()
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for segment in sorted(self.segments.values(), key=lambda segment: segment["seq"]):
+                f.write(json.dumps(segment) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        self._sync_dir()
+        self.index = open(self.index_path, 'a')
+
+    def write(self, data):
+        if self.mm is not None and self.pos + len(data) > len(self.mm):
+            self._close_segment()
+        if self.mm is None:
+            self._open(max(SEGMENT_BYTES, len(data)))
+        self.mm[self.pos:self.pos + len(data)] = data
+        self.pos += len(data)
+
+    def flush(self):
+        # Stores into the mapping are already visible to readers of the file
+        pass
+
+    def sync(self):
+        if self.mm is None or self.segment["length"] == self.pos:
+            return
+        self.mm.flush()
+        self.segment["length"] = self.pos
+        self._append_index()
 
-        content_length = int(self.headers.get('Content-Length', 0))
-        body = self.rfile.read(content_length)
+    def close(self):
+        if self.mm is not None:
+            self._close_segment()
+        self.index.close()
 
+def open_output(path):
+    if OUTPUT_MODE == 'mmap':
+        return MmapSegmentOutput(path)
+    return AppendOutput(path)
+
+class Journal:
+    """Write-behind journal: one background thread owns the output file.
+
+    Request threads queue encoded data; the writer coalesces everything
+    pending into a single write, and fsyncs at most every GROUP_COMMIT_MS.
+    In durable mode append() returns only after the data is fsynced.
+    """
+
+    def __init__(self, path, name='journal'):
+        self.output = open_output(path)
+        self.durable = DURABILITY == 'durable'
+        self.interval = GROUP_COMMIT_MS / 1000
+        self.queue = queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def append(self, data):
+        """Queue bytes for writing; in durable mode wait until they are on disk."""
+        if self.error is not None:
+            raise self.error
+        done = threading.Event() if self.durable else None
+        self.queue.put((data, done))
+        if done is not None:
+            done.wait()
+            if self.error is not None:
+                raise self.error
+
+    def _run(self):
+        waiters = []
         try:
-            # Try to parse as JSON for pretty output
-            data = json.loads(body.decode('utf-8'))
-            line = json.dumps(data)
-        except:
-            # If not JSON, write raw
-            line = body.decode('utf-8', errors='replace')
+            self._write_loop(waiters)
+        except Exception as e:
+            print(f"Journal writer failed: {e}")
+            self.error = e
+            for done in waiters:
+                done.set()
+            # Fail any requests still queued
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    return
+                if item[1] is not None:
+                    item[1].set()
+
+    def _write_loop(self, waiters):
+        dirty = False
+        last_sync = time.monotonic()
+        while True:
+            # Sleep until work arrives, or until the next fsync is due
+            timeout = max(0.0, last_sync + self.interval - time.monotonic()) if dirty else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+
+            stopping = False
+            pending = []
+            while item:
+                data, done = item
+                pending.append(data)
+                if done is not None:
+                    waiters.append(done)
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    item = False
+            if item is None:
+                stopping = True
+
+            if pending:
+                write_start = time.monotonic()
+                data = b''.join(pending)
+                self.output.write(data)
+                self.output.flush()
+                WRITE_DURATION.observe(time.monotonic() - write_start)
+                BYTES_WRITTEN.inc(len(data))
+                dirty = True
+
+            now = time.monotonic()
+            if dirty and (stopping or now >= last_sync + self.interval):
+                self.output.sync()
+                SYNC_DURATION.observe(time.monotonic() - now)
+                dirty = False
+                last_sync = now
+                for done in waiters:
+                    done.set()
+                waiters.clear()
+
+            if stopping:
+                self.output.close()
+                return
 
-        # Append to file
-        with open(OUTPUT_FILE, 'a') as f:
-            f.write(line + '\n')
+    def close(self):
+        """Write and fsync everything queued, then stop the writer."""
+        self.queue.put(None)
+        self.thread.join()
 
-        print(f"[{datetime.now().isoformat()}] Received event: {line[:100]}...")
+journal = None
+# Journals for compressed bodies stored as received, by encoding
+compressed_journals = {}
 
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
+class FileWriterHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keep-alive. Every request body is consumed in full (including
+    # chunked bodies) and every response carries Content-Length, so the next
+    # request on a connection always starts at a header boundary. Leftover
+    # body bytes being parsed as headers is what used to trip the
+    # "got more than 100 headers" limit.
+    protocol_version = "HTTP/1.1"
+    # Close idle keep-alive connections so their threads exit
+    timeout = 60
+    disable_nagle_algorithm = True
+
+    def _body_chunks(self):
+        """Yield the request body as it arrives off the socket."""
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            while True:
+                size_line = self.rfile.readline(65537)
+                if not size_line:
+                    raise BadRequest("chunked body ended before the last chunk")
+                try:
+                    size = int(size_line.split(b';', 1)[0].strip(), 16)
+                except ValueError:
+                    raise BadRequest(f"invalid chunk size line: {size_line[:40]!r}")
+                if size == 0:
+                    # Skip optional trailers up to the terminating empty line
+                    while self.rfile.readline(65537) not in (b'\r\n', b'\n', b''):
+                        pass
+                    return
+                chunk = self.rfile.read(size)
+                if len(chunk) < size or not self.rfile.readline(3):
+                    raise BadRequest("chunked body ended before the last chunk")
+                yield chunk
+        try:
+            remaining = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            raise BadRequest("invalid Content-Length")
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, READ_CHUNK_BYTES))
+            if not chunk:
+                raise BadRequest("body shorter than Content-Length")
+            remaining -= len(chunk)
+            yield chunk
+
+    def _read_body(self, encoding):
+        """Read the complete request body, inflating it if compressed."""
+        chunks = self._body_chunks()
+        if encoding is None:
+            return b''.join(chunks)
+        received = []
+        def counted():
+            for chunk in chunks:
+                received.append(len(chunk))
+                yield chunk
+        try:
+            return decompress_chunks(counted(), encoding)
+        finally:
+            COMPRESSED_BYTES.inc(sum(received), label_value=encoding)
+
+    def _store_compressed(self, encoding):
+        """Append a compressed body to its journal without normalizing it.
+
+        Concatenated gzip members and zstd frames are themselves a valid
+        stream, so the stored file decompresses to the bodies in order.
+        The frames are only checked, never kept inflated. Bodies beyond
+        MAX_BODY_BYTES are rejected as they arrive.
+        """
+        chunks = []
+        size = 0
+        try:
+            for chunk in self._body_chunks():
+                size += len(chunk)
+                if size > MAX_BODY_BYTES:
+                    raise RequestError(413, f"compressed body exceeds {MAX_BODY_BYTES} bytes")
+                chunks.append(chunk)
+        finally:
+            COMPRESSED_BYTES.inc(size, label_value=encoding)
+        data = b''.join(chunks)
+        decompress_chunks([data], encoding, keep=False)
+        if data:
+            try:
+                compressed_journals[encoding].append(data)
+            except Exception as e:
+                self._send(500, json.dumps({"status": "error", "error": str(e)}).encode('utf-8'))
+                return
+        self._send(200, json.dumps({"status": "ok", "stored_bytes": len(data)}).encode('utf-8'))
+
+    def _send(self, code, body, content_type='application/json'):
+        # Only POSTs are requests_total; scrapes of /metrics are not
+        if self.command == 'POST':
+            REQUESTS.inc(label_value=code)
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(b'{"status": "ok"}')
+        self.wfile.write(body)
+
+    def do_POST(self):
+        start = time.monotonic()
+        try:
+            self._handle_post()
+        finally:
+            REQUEST_DURATION.observe(time.monotonic() - start)
+
+    def _handle_post(self):
+        try:
+            encoding = content_encoding(self.headers)
+            if encoding is not None and STORE_COMPRESSED:
+                self._store_compressed(encoding)
+                return
+            body = self._read_body(encoding)
+        except BadRequest as e:
+            self.close_connection = True
+            self._send(400, json.dumps({"status": "error", "error": str(e)}).encode('utf-8'))
+            return
+        except RequestError as e:
+            # The rest of the body may still be unread
+            self.close_connection = True
+            self._send(e.code, json.dumps({"status": "error", "error": str(e)}).encode('utf-8'))
+            return
+        except socket.timeout:
+            # The client stopped sending mid-body
+            self.close_connection = True
+            self._send(408, json.dumps({"status": "error", "error": "timed out reading the request body"}).encode('utf-8'))
+            return
+
+        lines = parse_events(body, self.headers.get('Content-Type', ''))
+
+        # Hand the whole batch to the journal
+        if lines:
+            try:
+                journal.append(('\n'.join(lines) + '\n').encode('utf-8'))
+            except Exception as e:
+                self._send(500, json.dumps({"status": "error", "error": str(e)}).encode('utf-8'))
+                return
+            EVENTS.inc(len(lines))
+            sampled_log.received(len(lines), lines[0])
+
+        self._send(200, json.dumps({"status": "ok", "accepted": len(lines)}).encode('utf-8'))
 
     def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-Type', 'text/plain')
-        self.end_headers()
-        self.wfile.write(b'File Writer Service - POST events to write to file')
+        if self.path.split('?', 1)[0] == '/metrics':
+            self._send(200, render_metrics(), 'text/plain; version=0.0.4')
+            return
+        self._send(200, b'File Writer Service - POST events (a JSON object, a JSON array, or NDJSON) to write to file',
+                   'text/plain')
 
     def log_message(self, format, *args):
         # Suppress default logging
         pass
 
+class FileWriterServer(ThreadingHTTPServer):
+    # One thread per connection; don't block shutdown on idle keep-alive clients
+    daemon_threads = True
+    request_queue_size = 128
+
 if __name__ == '__main__':
     print(f"Starting file writer server on port 8080...")
     print(f"Writing events to {OUTPUT_FILE}")
-    server = HTTPServer(('0.0.0.0', 8080), FileWriterHandler)
-    server.serve_forever()
+    print(f"Durability: {DURABILITY}, group commit interval: {GROUP_COMMIT_MS}ms")
+    if OUTPUT_MODE == 'mmap':
+        print(f"Output mode: mmap segments of {SEGMENT_BYTES} bytes")
+    journal = Journal(OUTPUT_FILE)
+    if STORE_COMPRESSED:
+        print(f"Storing compressed bodies as received in {OUTPUT_FILE}.gz / {OUTPUT_FILE}.zst")
+        for encoding, suffix in ENCODING_SUFFIXES.items():
+            compressed_journals[encoding] = Journal(OUTPUT_FILE + suffix, name=f'journal-{encoding}')
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    server = FileWriterServer(('0.0.0.0', 8080), FileWriterHandler)
+    try:
+        server.serve_forever()
+    finally:
+        journal.close()
+        for compressed_journal in compressed_journals.values():
+            compressed_journal.close()
@@ -1,12 +1,36 @@
 #!/usr/bin/env python3
 """Kafka consumer that writes CDC events to a file."""
 
+import gzip
 import json
+import multiprocessing
 import os
+import queue
+import re
+import shutil
+import signal
 import sys
+import threading
 import time
 from datetime import datetime
-from kafka import KafkaConsumer
+from kafka import ConsumerRebalanceListener, KafkaConsumer, OffsetAndMetadata
+from kafka.coordinator.assignors.roundrobin import RoundRobinPartitionAssignor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
 
 # Disable output buffering
 sys.stdout.reconfigure(line_buffering=True)
@@ -15,53 +39,936 @@ BOOTSTRAP_SERVERS = os.environ.get('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092')
 TOPIC_PATTERN = os.environ.get('KAFKA_TOPIC_PATTERN', 'oracle.*')
 OUTPUT_FILE = os.environ.get('OUTPUT_FILE', '/app/output/events.json')
 GROUP_ID = os.environ.get('KAFKA_GROUP_ID', 'file-writer')
+# Number of consumer processes in the group; >1 writes one shard file per worker
+CONSUMER_WORKERS = int(os.environ.get('CONSUMER_WORKERS', '1'))
+# Max records returned by a single poll; each poll is written with one writelines()
+BATCH_SIZE = int(os.environ.get('BATCH_SIZE', '1000'))
+POLL_TIMEOUT_MS = int(os.environ.get('POLL_TIMEOUT_MS', '500'))
+# How often the buffered output handle is flushed to the OS
+FLUSH_INTERVAL_MS = int(os.environ.get('FLUSH_INTERVAL_MS', '1000'))
+# passthrough: write message bytes as received; normalize: re-serialize each JSON value;
+# parquet / arrow: per-table columnar files of the unpacked Debezium envelope (needs pyarrow)
+OUTPUT_FORMAT = os.environ.get('OUTPUT_FORMAT', 'normalize')
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+OUTPUT_FORMATS = ('passthrough', 'normalize') + COLUMNAR_FORMATS
+# A table's buffered rows are written out at this many rows or this age
+COLUMNAR_FLUSH_ROWS = int(os.environ.get('COLUMNAR_FLUSH_ROWS', '50000'))
+COLUMNAR_FLUSH_SECONDS = int(os.environ.get('COLUMNAR_FLUSH_SECONDS', '60'))
+# auto: Kafka commits offsets on a timer; manual: commit each batch once it is durable
+COMMIT_MODE = os.environ.get('COMMIT_MODE', 'auto')
+COMMIT_MODES = ('auto', 'manual')
+# batch: fsync after every batch; interval: every FSYNC_INTERVAL_MS; never: rely on the page cache
+FSYNC_POLICY = os.environ.get('FSYNC_POLICY', 'never')
+FSYNC_POLICIES = ('batch', 'interval', 'never')
+FSYNC_INTERVAL_MS = int(os.environ.get('FSYNC_INTERVAL_MS', '1000'))
+# Roll the output into segments by on-disk size and/or age (0 disables each)
+ROTATE_BYTES = int(os.environ.get('OUTPUT_ROTATE_BYTES', '0'))
+ROTATE_SECONDS = int(os.environ.get('OUTPUT_ROTATE_SECONDS', '0'))
+# none | gzip | zstd (zstd needs the zstandard package)
+COMPRESSION = os.environ.get('OUTPUT_COMPRESSION', 'none')
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+COMPRESSION_LEVEL = int(os.environ.get('OUTPUT_COMPRESSION_LEVEL', '6' if COMPRESSION == 'gzip' else '3'))
+# Run fetch, transform and write as separate threads joined by bounded queues
+PIPELINE = os.environ.get('PIPELINE', 'false').lower() in ('1', 'true', 'yes')
+# Max batches waiting between two pipeline stages
+PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', '4'))
+# Prometheus /metrics port (0 disables); needs prometheus-client
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9400'))
+METRICS_MULTIPROC_DIR = '/tmp/kafka-consumer-metrics'
+WRITE_BUFFER_BYTES = 1024 * 1024
+NEWLINE = b'\n'
+REPORT_INTERVAL = 10
+LAG_INTERVAL = 5
+# Debezium's source block is flat, so the first ts_ms inside it is source.ts_ms
+SOURCE_TS_MS = re.compile(rb'"source":\s*\{[^{}]*?"ts_ms":\s*(\d+)')
 
-def main():
-    print(f"Connecting to Kafka at {BOOTSTRAP_SERVERS}")
-    print(f"Subscribing to topics matching: {TOPIC_PATTERN}")
-    print(f"Writing events to: {OUTPUT_FILE}")
+if orjson is not None:
+    json_loads, json_dumps = orjson.loads, orjson.dumps
+else:
+    json_loads = json.loads
+    # Same bytes as orjson: compact separators, non-ASCII left unescaped
+    json_dumps = lambda data: json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def normalize_value(value):
+    """Re-serialize one JSON message value for consistent formatting."""
+    try:
+        return json_dumps(json_loads(value))
+    except ValueError:
+        # Not JSON, write raw
+        return value
+
+def format_chunks(batch):
+    """Yield the byte chunks to write for a polled batch, one line per message."""
+    if OUTPUT_FORMAT == 'passthrough':
+        # Message values stay as the fetched bytes; only the newline is added
+        for messages in batch.values():
+            for message in messages:
+                if message.value is not None:
+                    yield message.value
+                    yield NEWLINE
+    else:
+        for messages in batch.values():
+            for message in messages:
+                if message.value is not None:
+                    yield normalize_value(message.value)
+                    yield NEWLINE
+
+class ConsumerMetrics:
+    """Prometheus metrics for the consumer.
+
+    In worker mode the metrics live in prometheus_client's multiprocess
+    directory and are served by the supervisor.
+    """
+
+    def __init__(self):
+        from prometheus_client import Counter, Gauge, Histogram
+        self.events = Counter('kafka_consumer_events_total', 'Events written to the sink', ['topic'])
+        self.bytes = Counter('kafka_consumer_bytes_total', 'Message bytes written to the sink', ['topic'])
+        self.tombstones = Counter('kafka_consumer_tombstones_total', 'Tombstones consumed and not written', ['topic'])
+        self.latency = Histogram(
+            'kafka_consumer_e2e_latency_seconds',
+            'Oracle commit (Debezium source.ts_ms) to sink write latency',
+            buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+        )
+        self.write_duration = Histogram(
+            'kafka_consumer_write_batch_duration_seconds', 'Time to write one polled batch to the sink',
+            buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+        )
+        self.lag = Gauge(
+            'kafka_consumer_lag', 'Messages between the consumer position and the high watermark',
+            ['topic', 'partition'], multiprocess_mode='livemax',
+        )
+        self.stage_seconds = Counter(
+            'kafka_consumer_stage_seconds_total', 'Time pipeline stages spent busy, idle or blocked',
+            ['stage', 'state'],
+        )
+        self.queue_depth = Gauge(
+            'kafka_consumer_queue_depth', 'Batches waiting in a pipeline queue',
+            ['queue'], multiprocess_mode='livesum',
+        )
+        self.last_lag_update = 0.0
+
+    def record_batch(self, batch, write_seconds, now):
+        self.write_duration.observe(write_seconds)
+        now_ms = now * 1000
+        for tp, messages in batch.items():
+            size = tombstones = 0
+            for message in messages:
+                if message.value is None:
+                    tombstones += 1
+                    continue
+                size += len(message.value)
+                match = SOURCE_TS_MS.search(message.value)
+                if match:
+                    self.latency.observe(max(now_ms - int(match.group(1)), 0) / 1000)
+            self.events.labels(tp.topic).inc(len(messages) - tombstones)
+            self.bytes.labels(tp.topic).inc(size)
+            if tombstones:
+                self.tombstones.labels(tp.topic).inc(tombstones)
+
+    def update_lag(self, consumer, now):
+        if now - self.last_lag_update < LAG_INTERVAL:
+            return
+        self.last_lag_update = now
+        for tp in consumer.assignment():
+            highwater = consumer.highwater(tp)
+            if highwater is not None:
+                self.lag.labels(tp.topic, str(tp.partition)).set(highwater - consumer.position(tp))
+
+    def clear_lag(self, partitions):
+        # Another member reports these now; livemax picks its value over our 0
+        for tp in partitions:
+            self.lag.labels(tp.topic, str(tp.partition)).set(0)
+
+metrics = None
+
+def setup_metrics(multiprocess):
+    """Create the consumer metrics and start the /metrics server, if enabled."""
+    global metrics
+    if METRICS_PORT == 0:
+        return
+    if multiprocess:
+        # Must be set before prometheus_client is imported
+        shutil.rmtree(METRICS_MULTIPROC_DIR, ignore_errors=True)
+        os.makedirs(METRICS_MULTIPROC_DIR)
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = METRICS_MULTIPROC_DIR
+    try:
+        from prometheus_client import CollectorRegistry, start_http_server
+        from prometheus_client import multiprocess as prometheus_multiprocess
+    except ImportError:
+        print("prometheus-client is not installed, metrics disabled")
+        return
+
+    metrics = ConsumerMetrics()
+    if multiprocess:
+        registry = CollectorRegistry()
+        prometheus_multiprocess.MultiProcessCollector(registry)
+        start_http_server(METRICS_PORT, registry=registry)
+    else:
+        start_http_server(METRICS_PORT)
+    print(f"Serving metrics on :{METRICS_PORT}/metrics")
+
+def shard_path(output_file, worker_id):
+    """Return the shard file for a worker, e.g. events.json -> events.2.json."""
+    root, ext = os.path.splitext(output_file)
+    return f"{root}.{worker_id}{ext}"
+
+class FileSink:
+    """Buffered append-only output file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'ab', buffering=WRITE_BUFFER_BYTES)
+
+    def write(self, batch, data=None):
+        if data is None:
+            self.file.writelines(format_chunks(batch))
+        else:
+            self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def sync(self):
+        """Flush and fsync everything written so far."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def unwritten(self):
+        """Per partition, the first offset written to the sink but held back
+        from the output file (columnar sinks buffer rows in memory)."""
+        return {}
+
+    def close(self):
+        self.file.close()
+
+class SegmentSink:
+    """Output rolled into numbered, optionally compressed segment files.
+
+    A segment is written as <stem>.<seq>.open<ext>[.gz|.zst] and renamed
+    on close to <stem>.<seq>.<first>-<last><ext>[.gz|.zst], where first
+    and last are the lowest and highest Kafka offsets it holds. Every
+    closed segment is appended to <stem>.index.jsonl together with its
+    exact per-partition offset ranges and sizes. A segment still open
+    after a crash is renamed to <stem>.<seq>.recovered<ext>[.gz|.zst] on
+    the next start and indexed without offsets.
+    """
+
+    def __init__(self, path):
+        self.dir = os.path.dirname(path) or '.'
+        self.stem, self.ext = os.path.splitext(os.path.basename(path))
+        self.suffix = {'gzip': '.gz', 'zstd': '.zst'}.get(COMPRESSION, '')
+        self.index = open(os.path.join(self.dir, f"{self.stem}.index.jsonl"), 'a')
+        self._recover_open()
+        self.seq = self._last_seq()
+        self.raw = None
+
+    def _segment_pattern(self, state):
+        """Match this sink's segments in a state (open, offsets, recovered); other shards' stems differ."""
+        return re.compile(re.escape(self.stem) + r'\.(\d{6,})\.' + state + re.escape(self.ext) + r'(\.gz|\.zst)?$')
+
+    def _recover_open(self):
+        # The last line (or compressed frame) may be cut short, and the
+        # offsets are unknown; uncommitted records are consumed again
+        pattern = self._segment_pattern('open')
+        for name in sorted(os.listdir(self.dir)):
+            match = pattern.match(name)
+            if not match:
+                continue
+            recovered = f"{self.stem}.{match.group(1)}.recovered{self.ext}{match.group(2) or ''}"
+            path = os.path.join(self.dir, recovered)
+            os.rename(os.path.join(self.dir, name), path)
+            print(f"Recovered segment left open by a crash: {name} -> {recovered}")
+            self.index.write(json.dumps({
+                "segment": recovered,
+                "recovered": True,
+                "stored_bytes": os.path.getsize(path),
+                "closed": datetime.now().isoformat(),
+            }) + '\n')
+        self.index.flush()
+
+    def _last_seq(self):
+        pattern = self._segment_pattern(r'(?:\d+-\d+|recovered)')
+        seqs = [int(m.group(1)) for m in map(pattern.match, os.listdir(self.dir)) if m]
+        return max(seqs, default=0)
+
+    def _open(self):
+        self.seq += 1
+        self.open_path = os.path.join(self.dir, f"{self.stem}.{self.seq:06d}.open{self.ext}{self.suffix}")
+        self.raw = open(self.open_path, 'wb', buffering=WRITE_BUFFER_BYTES)
+        if COMPRESSION == 'gzip':
+            self.stream = gzip.GzipFile(fileobj=self.raw, mode='wb', compresslevel=COMPRESSION_LEVEL)
+        elif COMPRESSION == 'zstd':
+            self.stream = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).stream_writer(self.raw, closefd=False)
+        else:
+            self.stream = self.raw
+        self.opened_at = time.time()
+        self.offsets = {}
+        self.records = 0
+        self.bytes_in = 0
+
+    def _close(self):
+        if self.stream is not self.raw:
+            # Writes the gzip trailer / final zstd frame
+            self.stream.close()
+        self.raw.flush()
+        if FSYNC_POLICY != 'never':
+            os.fsync(self.raw.fileno())
+        size = self.raw.tell()
+        self.raw.close()
+        self.raw = None
+
+        first = min(first for first, last in self.offsets.values())
+        last = max(last for first, last in self.offsets.values())
+        name = f"{self.stem}.{self.seq:06d}.{first}-{last}{self.ext}{self.suffix}"
+        os.rename(self.open_path, os.path.join(self.dir, name))
+        self.index.write(json.dumps({
+            "segment": name,
+            "records": self.records,
+            "bytes": self.bytes_in,
+            "stored_bytes": size,
+            "opened": datetime.fromtimestamp(self.opened_at).isoformat(),
+            "closed": datetime.now().isoformat(),
+            "offsets": {f"{tp.topic}/{tp.partition}": r for tp, r in sorted(self.offsets.items())},
+        }) + '\n')
+        self.index.flush()
+
+    def _rotate_due(self, now):
+        return (ROTATE_BYTES and self.raw.tell() >= ROTATE_BYTES) or \
+            (ROTATE_SECONDS and now - self.opened_at >= ROTATE_SECONDS)
+
+    def write(self, batch, data=None):
+        if self.raw is None:
+            self._open()
+        if data is None:
+            data = b''.join(format_chunks(batch))
+        self.stream.write(data)
+        self.bytes_in += len(data)
+        for tp, messages in batch.items():
+            self.records += len(messages)
+            first = self.offsets.get(tp, (messages[0].offset,))[0]
+            self.offsets[tp] = (first, messages[-1].offset)
+        if self._rotate_due(time.time()):
+            self._close()
+
+    def flush(self):
+        if self.raw is None:
+            return
+        if self.stream is not self.raw:
+            self.stream.flush()
+        self.raw.flush()
+        if self._rotate_due(time.time()):
+            self._close()
+
+    def sync(self):
+        if self.raw is None:
+            return
+        self.flush()
+        if self.raw is not None:
+            os.fsync(self.raw.fileno())
+
+    def unwritten(self):
+        return {}
+
+    def close(self):
+        if self.raw is not None:
+            self._close()
+        self.index.close()
+
+class ColumnarSink:
+    """Per-table columnar files of unpacked Debezium envelopes.
+
+    Rows are buffered per source table and written to
+    <dir>/<stem>/<SCHEMA.TABLE>/<first>-<last>.parquet (or .arrow) once a
+    table reaches COLUMNAR_FLUSH_ROWS rows or COLUMNAR_FLUSH_SECONDS age,
+    where first and last are the Kafka offsets of the rows it holds.
+    Columns: op, source_scn, source_ts_ms, before, after, kafka_partition,
+    kafka_offset. before/after are struct columns, so readers can project
+    individual table columns. Buffered rows are lost on a restart, so
+    offsets are only committed up to the first row not yet in a file
+    (see unwritten()).
+    """
+
+    def __init__(self, path):
+        if pyarrow is None:
+            raise RuntimeError(f"OUTPUT_FORMAT={OUTPUT_FORMAT} requires the pyarrow package")
+        stem = os.path.splitext(os.path.basename(path))[0]
+        self.dir = os.path.join(os.path.dirname(path) or '.', stem)
+        self.ext = '.parquet' if OUTPUT_FORMAT == 'parquet' else '.arrow'
+        self.compression = COMPRESSION if COMPRESSION != 'none' else None
+        self.tables = {}  # table -> (first buffered at, rows, {partition: first buffered offset})
+
+    def write(self, batch, data=None):
+        now = time.time()
+        for tp, messages in batch.items():
+            for message in messages:
+                if message.value is None:
+                    continue
+                try:
+                    event = json_loads(message.value)
+                except ValueError:
+                    continue
+                source = event.get('source') or {}
+                if source.get('table'):
+                    table = f"{source.get('schema')}.{source['table']}"
+                else:
+                    table = tp.topic
+                if table not in self.tables:
+                    self.tables[table] = (now, [], {})
+                _, rows, first_offsets = self.tables[table]
+                first_offsets.setdefault(tp, message.offset)
+                rows.append({
+                    'op': event.get('op'),
+                    'source_scn': source.get('scn'),
+                    'source_ts_ms': source.get('ts_ms'),
+                    'before': event.get('before'),
+                    'after': event.get('after'),
+                    'kafka_partition': tp.partition,
+                    'kafka_offset': message.offset,
+                })
+        self._write_due(now, force=False)
+
+    def _write_table(self, table, rows):
+        try:
+            arrow_table = pyarrow.Table.from_pylist(rows)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+            # Column types changed within the batch (e.g. DDL); keep row images as JSON text
+            for row in rows:
+                for image in ('before', 'after'):
+                    if row[image] is not None:
+                        row[image] = json_dumps(row[image]).decode('utf-8')
+            arrow_table = pyarrow.Table.from_pylist(rows)
+
+        offsets = [row['kafka_offset'] for row in rows]
+        table_dir = os.path.join(self.dir, table)
+        os.makedirs(table_dir, exist_ok=True)
+        path = os.path.join(table_dir, f"{min(offsets)}-{max(offsets)}{self.ext}")
+        tmp_path = path + '.tmp'
+        if self.ext == '.parquet':
+            pyarrow.parquet.write_table(arrow_table, tmp_path, compression=self.compression or 'none')
+        else:
+            options = pyarrow.ipc.IpcWriteOptions(compression='zstd' if self.compression == 'zstd' else None)
+            with pyarrow.ipc.new_file(tmp_path, arrow_table.schema, options=options) as writer:
+                writer.write_table(arrow_table)
+        if FSYNC_POLICY != 'never':
+            fd = os.open(tmp_path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        os.rename(tmp_path, path)
+
+    def _write_due(self, now, force):
+        for table, (started, rows, _) in list(self.tables.items()):
+            if force or len(rows) >= COLUMNAR_FLUSH_ROWS or now - started >= COLUMNAR_FLUSH_SECONDS:
+                self._write_table(table, rows)
+                del self.tables[table]
+
+    def unwritten(self):
+        held = {}
+        for _, _, first_offsets in self.tables.values():
+            for tp, offset in first_offsets.items():
+                held[tp] = min(offset, held.get(tp, offset))
+        return held
+
+    def flush(self):
+        self._write_due(time.time(), force=False)
+
+    def sync(self):
+        self._write_due(time.time(), force=True)
+
+    def close(self):
+        self.sync()
+
+def encode_batch(batch):
+    """Pre-encode a batch for line-oriented sinks; columnar sinks decode in write()."""
+    if OUTPUT_FORMAT in COLUMNAR_FORMATS:
+        return None
+    return b''.join(format_chunks(batch))
+
+def open_sink(path):
+    """Return the sink for path according to the output format and rotation/compression settings."""
+    if OUTPUT_FORMAT in COLUMNAR_FORMATS:
+        return ColumnarSink(path)
+    if ROTATE_BYTES or ROTATE_SECONDS or COMPRESSION != 'none':
+        return SegmentSink(path)
+    return FileSink(path)
+
+class CommitTracker(ConsumerRebalanceListener):
+    """Tracks written-but-uncommitted offsets and commits them once durable.
+
+    In auto commit mode it only applies FSYNC_POLICY. In manual mode the
+    offsets of everything written since the last commit are committed
+    with a single commit() call right after the data is flushed (and
+    fsynced, unless FSYNC_POLICY=never), so a restart replays at most
+    the batches written since the last durable point. A partition with
+    rows still buffered by the sink is committed up to its first
+    buffered row only.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.commit = None  # callable taking the offsets dict
+        self.manual = COMMIT_MODE == 'manual'
+        self.pending = {}
+        self.committed = {}  # last offset committed per partition
+        self.dirty = False
+        self.last_flush = self.last_sync = time.time()
+
+    def written(self, batch):
+        """Record a batch that has been handed to the sink."""
+        self.dirty = True
+        if self.manual:
+            for tp, messages in batch.items():
+                self.pending[tp] = OffsetAndMetadata(messages[-1].offset + 1, '')
 
-    # Wait for Kafka to be ready
-    consumer = None
-    while consumer is None:
+    def checkpoint(self, now, force=False):
+        """Flush, fsync and commit according to FSYNC_POLICY and COMMIT_MODE."""
+        if not self.dirty:
+            return
+        sync_due = force or FSYNC_POLICY == 'batch' or (
+            FSYNC_POLICY == 'interval' and (now - self.last_sync) * 1000 >= FSYNC_INTERVAL_MS)
+        if force or (FSYNC_POLICY != 'never' and sync_due):
+            self.sink.sync()
+            self.last_sync = self.last_flush = now
+        elif (self.manual and FSYNC_POLICY == 'never') or (now - self.last_flush) * 1000 >= FLUSH_INTERVAL_MS:
+            self.sink.flush()
+            self.last_flush = now
+            if FSYNC_POLICY != 'never':
+                # Flushed but not yet durable; keep the offsets pending
+                return
+        else:
+            return
+        held = self.sink.unwritten()
+        # Rows still held back need later checkpoints to write them out
+        self.dirty = bool(held)
+        offsets = {}
+        for tp, offset in list(self.pending.items()):
+            if tp in held:
+                offset = OffsetAndMetadata(held[tp], '')
+            else:
+                del self.pending[tp]
+            if offset.offset != self.committed.get(tp):
+                offsets[tp] = offset
+                self.committed[tp] = offset.offset
+        if offsets:
+            self.commit(offsets)
+
+    def on_partitions_revoked(self, revoked):
+        # Commit what we have written before another member takes over
+        self.checkpoint(time.time(), force=True)
+        if metrics is not None:
+            metrics.clear_lag(revoked)
+
+    def on_partitions_assigned(self, assigned):
+        pass
+
+def connect(listener=None):
+    """Create a consumer subscribed to TOPIC_PATTERN, retrying until Kafka is ready."""
+    while True:
         try:
             consumer = KafkaConsumer(
                 bootstrap_servers=BOOTSTRAP_SERVERS.split(','),
                 group_id=GROUP_ID,
                 auto_offset_reset='earliest',
-                enable_auto_commit=True,
-                value_deserializer=lambda x: x.decode('utf-8', errors='replace'),
+                enable_auto_commit=COMMIT_MODE != 'manual',
+                max_poll_records=BATCH_SIZE,
+                # TPCC topics have a single partition each; round-robin spreads
+                # whole topics across workers where range assignment would not
+                partition_assignment_strategy=(RoundRobinPartitionAssignor,),
             )
-            consumer.subscribe(pattern=TOPIC_PATTERN)
+            consumer.subscribe(pattern=TOPIC_PATTERN, listener=listener)
             print("Connected to Kafka successfully")
+            return consumer
         except Exception as e:
             print(f"Failed to connect to Kafka: {e}, retrying in 5s...")
             time.sleep(5)
 
+def consume(output_file, counter=None):
+    """Poll batches and append them to output_file until SIGTERM.
+
+    When counter is given (worker mode), the processed event count is
+    published there for the supervisor instead of being printed.
+    """
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+
+    sink = open_sink(output_file)
+    tracker = CommitTracker(sink)
+    consumer = connect(listener=tracker)
+    tracker.commit = lambda offsets: consumer.commit(offsets=offsets)
+
     event_count = 0
     last_report = time.time()
+    last_topic = None
 
-    for message in consumer:
-        try:
-            # Try to parse as JSON for consistent formatting
-            data = json.loads(message.value)
-            line = json.dumps(data)
-        except json.JSONDecodeError:
-            line = message.value
-
-        # Append to file
-        with open(OUTPUT_FILE, 'a') as f:
-            f.write(line + '\n')
+    while not stopping.is_set():
+        batch = consumer.poll(timeout_ms=POLL_TIMEOUT_MS, max_records=BATCH_SIZE)
 
-        event_count += 1
+        if batch:
+            write_start = time.time()
+            sink.write(batch)
+            tracker.written(batch)
+            for tp, messages in batch.items():
+                event_count += len(messages)
+                last_topic = tp.topic
+            if metrics is not None:
+                written_at = time.time()
+                metrics.record_batch(batch, written_at - write_start, written_at)
 
-        # Report throughput every 10 seconds
         now = time.time()
-        if now - last_report >= 10:
+        tracker.checkpoint(now)
+        if metrics is not None:
+            metrics.update_lag(consumer, now)
+
+        if counter is not None:
+            counter.value += event_count
+            event_count = 0
+        elif now - last_report >= REPORT_INTERVAL:
             rate = event_count / (now - last_report)
-            print(f"[{datetime.now().isoformat()}] Throughput: {rate:.1f} events/sec (topic: {message.topic})")
+            print(f"[{datetime.now().isoformat()}] Throughput: {rate:.1f} events/sec (topic: {last_topic})")
             event_count = 0
             last_report = now
 
+    print("Shutting down, committing written events...")
+    tracker.checkpoint(time.time(), force=True)
+    consumer.close(autocommit=COMMIT_MODE != 'manual')
+    sink.close()
+
+class StageTimer:
+    """Accumulates the time a pipeline stage spends in each state.
+
+    busy: doing work; idle: waiting for input; blocked: waiting for room
+    in a full downstream queue (backpressure).
+    """
+
+    STATES = ('busy', 'idle', 'blocked')
+
+    def __init__(self, name):
+        self.name = name
+        self.totals = dict.fromkeys(self.STATES, 0.0)
+        self.state = 'idle'
+        self.since = time.monotonic()
+
+    def enter(self, state):
+        now = time.monotonic()
+        elapsed = now - self.since
+        self.totals[self.state] += elapsed
+        if metrics is not None:
+            metrics.stage_seconds.labels(self.name, self.state).inc(elapsed)
+        self.state = state
+        self.since = now
+
+    def snapshot(self):
+        totals = dict(self.totals)
+        totals[self.state] += time.monotonic() - self.since
+        return totals
+
+class PipelineCommitTracker(CommitTracker):
+    """CommitTracker for pipeline mode, driven from the writer thread.
+
+    Commits are queued for the fetch thread, which owns the consumer. On
+    a rebalance the fetch thread drains the pipeline before committing.
+    """
+
+    def __init__(self, sink, pipeline):
+        super().__init__(sink)
+        self.pipeline = pipeline
+        self.commit = pipeline.commits.put
+
+    def on_partitions_revoked(self, revoked):
+        self.pipeline.drain()
+        with self.pipeline.sink_lock:
+            self.checkpoint(time.time(), force=True)
+        self.pipeline.commit_pending()
+        if metrics is not None:
+            metrics.clear_lag(revoked)
+
+class Pipeline:
+    """Fetch, transform and write stages connected by bounded queues.
+
+    The fetch stage runs on the calling thread and is the only one that
+    touches the consumer. The transform stage pre-encodes each batch and
+    the write stage owns the sink, so fetching overlaps with disk writes.
+    """
+
+    def __init__(self, output_file, counter=None):
+        self.counter = counter
+        self.stopping = threading.Event()
+        self.failed = threading.Event()
+        self.error = None
+        self.encoded = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self.fetched = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self.commits = queue.Queue()
+        self.sink_lock = threading.Lock()
+        self.timers = {name: StageTimer(name) for name in ('fetch', 'transform', 'write')}
+        self.event_count = 0
+        self.sink = open_sink(output_file)
+        self.tracker = PipelineCommitTracker(self.sink, self)
+        self.consumer = connect(listener=self.tracker)
+
+    def _put(self, q, item, timer):
+        timer.enter('blocked')
+        while True:
+            try:
+                q.put(item, timeout=0.5)
+                break
+            except queue.Full:
+                self._check_failed()
+        timer.enter('busy')
+
+    def _get(self, q, timer):
+        timer.enter('idle')
+        item = q.get()
+        timer.enter('busy')
+        return item
+
+    def _check_failed(self):
+        """Re-raise the exception of a failed stage in the calling thread."""
+        if self.failed.is_set():
+            raise self.error
+
+    def _join(self, q):
+        """Like q.join(), but gives up once a stage has failed."""
+        with q.all_tasks_done:
+            while q.unfinished_tasks:
+                self._check_failed()
+                q.all_tasks_done.wait(timeout=0.5)
+
+    def _run_stage(self, target):
+        try:
+            target()
+        except Exception as e:
+            print(f"Pipeline stage failed: {e}")
+            self.error = e
+            self.failed.set()
+            self.stopping.set()
+            raise
+
+    def transform(self):
+        timer = self.timers['transform']
+        while True:
+            batch = self._get(self.fetched, timer)
+            item = None if batch is None else (batch, encode_batch(batch))
+            self._put(self.encoded, item, timer)
+            self.fetched.task_done()
+            if batch is None:
+                return
+
+    def write(self):
+        timer = self.timers['write']
+        while True:
+            try:
+                item = self.encoded.get(timeout=POLL_TIMEOUT_MS / 1000)
+            except queue.Empty:
+                # Keep time-based flushes and commits going while idle
+                with self.sink_lock:
+                    self.tracker.checkpoint(time.time())
+                timer.enter('idle')
+                continue
+            timer.enter('busy')
+            if item is None:
+                self.encoded.task_done()
+                return
+            batch, data = item
+            with self.sink_lock:
+                write_start = time.time()
+                self.sink.write(batch, data)
+                self.tracker.written(batch)
+                written_at = time.time()
+                self.tracker.checkpoint(written_at)
+            if metrics is not None:
+                metrics.record_batch(batch, written_at - write_start, written_at)
+            self.event_count += sum(len(messages) for messages in batch.values())
+            self.encoded.task_done()
+            timer.enter('idle')
+
+    def drain(self):
+        """Wait until every fetched batch has been written."""
+        self._join(self.fetched)
+        self._join(self.encoded)
+
+    def commit_pending(self):
+        """Commit offsets the writer has made durable (fetch thread only)."""
+        while True:
+            try:
+                offsets = self.commits.get_nowait()
+            except queue.Empty:
+                return
+            self.consumer.commit(offsets=offsets)
+
+    def report(self, elapsed, last):
+        totals = {name: timer.snapshot() for name, timer in self.timers.items()}
+        stages = " | ".join(
+            f"{name} " + " ".join(
+                f"{state} {100 * (totals[name][state] - last.get(name, {}).get(state, 0.0)) / elapsed:.0f}%"
+                for state in StageTimer.STATES)
+            for name in self.timers)
+        print(f"[{datetime.now().isoformat()}] Stages: {stages} | "
+              f"queues fetched {self.fetched.qsize()}/{PIPELINE_QUEUE_SIZE} encoded {self.encoded.qsize()}/{PIPELINE_QUEUE_SIZE}")
+        return totals
+
+    def run(self):
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stopping.set())
+        threads = [
+            threading.Thread(target=self._run_stage, args=(self.transform,), name='transform', daemon=True),
+            threading.Thread(target=self._run_stage, args=(self.write,), name='write', daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        timer = self.timers['fetch']
+        last_report = time.time()
+        last_totals = {}
+        reported_count = 0
+        while not self.stopping.is_set():
+            timer.enter('idle')
+            batch = self.consumer.poll(timeout_ms=POLL_TIMEOUT_MS, max_records=BATCH_SIZE)
+            timer.enter('busy')
+            if batch:
+                self._put(self.fetched, batch, timer)
+
+            self.commit_pending()
+            now = time.time()
+            if metrics is not None:
+                metrics.update_lag(self.consumer, now)
+                metrics.queue_depth.labels('fetched').set(self.fetched.qsize())
+                metrics.queue_depth.labels('encoded').set(self.encoded.qsize())
+
+            written = self.event_count
+            if self.counter is not None:
+                self.counter.value += written - reported_count
+                reported_count = written
+            if now - last_report >= REPORT_INTERVAL:
+                if self.counter is None:
+                    rate = (written - reported_count) / (now - last_report)
+                    print(f"[{datetime.now().isoformat()}] Throughput: {rate:.1f} events/sec")
+                    reported_count = written
+                last_totals = self.report(now - last_report, last_totals)
+                last_report = now
+
+        print("Shutting down, draining pipeline...")
+        if not self.failed.is_set():
+            self._put(self.fetched, None, timer)
+            for thread in threads:
+                thread.join()
+        with self.sink_lock:
+            self.tracker.checkpoint(time.time(), force=True)
+        self.commit_pending()
+        self.consumer.close(autocommit=COMMIT_MODE != 'manual')
+        self.sink.close()
+
+def run_worker(worker_id, counter):
+    """Entry point of a worker process."""
+    # Let the supervisor decide when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    output_file = shard_path(OUTPUT_FILE, worker_id)
+    print(f"Worker {worker_id} (pid {os.getpid()}) writing to {output_file}")
+    if PIPELINE:
+        Pipeline(output_file, counter).run()
+    else:
+        consume(output_file, counter)
+
+def supervise(num_workers):
+    """Run num_workers consumer processes, restart any that die, and report combined throughput."""
+    counters = [multiprocessing.Value('Q', 0, lock=False) for _ in range(num_workers)]
+    workers = [None] * num_workers
+
+    def start(worker_id):
+        proc = multiprocessing.Process(
+            target=run_worker, args=(worker_id, counters[worker_id]),
+            name=f"kafka-consumer-{worker_id}", daemon=True,
+        )
+        proc.start()
+        workers[worker_id] = proc
+
+    def stop(signum, frame):
+        for proc in workers:
+            if proc is not None and proc.is_alive():
+                proc.terminate()
+        for proc in workers:
+            if proc is not None:
+                proc.join(timeout=10)
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for worker_id in range(num_workers):
+        start(worker_id)
+
+    last_counts = [0] * num_workers
+    last_report = time.time()
+    while True:
+        time.sleep(1)
+        for worker_id, proc in enumerate(workers):
+            if not proc.is_alive():
+                print(f"Worker {worker_id} exited with code {proc.exitcode}, restarting...")
+                if metrics is not None:
+                    from prometheus_client import multiprocess as prometheus_multiprocess
+                    prometheus_multiprocess.mark_process_dead(proc.pid)
+                start(worker_id)
+
+        now = time.time()
+        if now - last_report >= REPORT_INTERVAL:
+            counts = [c.value for c in counters]
+            rates = [(cur - prev) / (now - last_report) for cur, prev in zip(counts, last_counts)]
+            per_worker = ", ".join(f"w{i}={r:.1f}" for i, r in enumerate(rates))
+            print(f"[{datetime.now().isoformat()}] Throughput: {sum(rates):.1f} events/sec ({per_worker})")
+            last_counts = counts
+            last_report = now
+
+def check_config():
+    """Exit with an error on settings the consumer cannot honour."""
+    errors = []
+    if OUTPUT_FORMAT not in OUTPUT_FORMATS:
+        errors.append(f"OUTPUT_FORMAT={OUTPUT_FORMAT} is not one of {', '.join(OUTPUT_FORMATS)}")
+    if COMMIT_MODE not in COMMIT_MODES:
+        errors.append(f"COMMIT_MODE={COMMIT_MODE} is not one of {', '.join(COMMIT_MODES)}")
+    if FSYNC_POLICY not in FSYNC_POLICIES:
+        errors.append(f"FSYNC_POLICY={FSYNC_POLICY} is not one of {', '.join(FSYNC_POLICIES)}")
+    if COMPRESSION not in COMPRESSIONS:
+        errors.append(f"OUTPUT_COMPRESSION={COMPRESSION} is not one of {', '.join(COMPRESSIONS)}")
+    elif COMPRESSION == 'zstd' and zstandard is None:
+        errors.append("OUTPUT_COMPRESSION=zstd requires the zstandard package")
+    if OUTPUT_FORMAT in COLUMNAR_FORMATS and COMMIT_MODE != 'manual':
+        # Auto commit would commit rows still buffered in memory
+        errors.append(f"OUTPUT_FORMAT={OUTPUT_FORMAT} requires COMMIT_MODE=manual")
+    for error in errors:
+        print(f"Configuration error: {error}")
+    if errors:
+        sys.exit(1)
+
+def main():
+    check_config()
+    print(f"Connecting to Kafka at {BOOTSTRAP_SERVERS}")
+    print(f"Subscribing to topics matching: {TOPIC_PATTERN}")
+    print(f"Writing events to: {OUTPUT_FILE}")
+    print(f"Batch size: {BATCH_SIZE}, poll timeout: {POLL_TIMEOUT_MS}ms, flush interval: {FLUSH_INTERVAL_MS}ms")
+    if OUTPUT_FORMAT == 'normalize':
+        print(f"Output format: normalize ({'orjson' if orjson is not None else 'json'})")
+    else:
+        print(f"Output format: {OUTPUT_FORMAT}")
+    print(f"Commit mode: {COMMIT_MODE}, fsync policy: {FSYNC_POLICY}")
+    if OUTPUT_FORMAT in COLUMNAR_FORMATS:
+        print(f"Columnar output: {OUTPUT_FORMAT}, flush at {COLUMNAR_FLUSH_ROWS} rows / {COLUMNAR_FLUSH_SECONDS}s per table")
+        if FSYNC_POLICY != 'never':
+            print(f"Warning: columnar output with FSYNC_POLICY={FSYNC_POLICY} writes out every buffered table "
+                  "at each fsync; with never, tables are written at the flush thresholds and offsets are "
+                  "committed as they are written")
+    if ROTATE_BYTES or ROTATE_SECONDS or COMPRESSION != 'none':
+        print(f"Segments: rotate at {ROTATE_BYTES} bytes / {ROTATE_SECONDS}s, compression: {COMPRESSION}")
+
+    setup_metrics(multiprocess=CONSUMER_WORKERS > 1)
+
+    if CONSUMER_WORKERS > 1:
+        print(f"Starting {CONSUMER_WORKERS} worker processes")
+        supervise(CONSUMER_WORKERS)
+    elif PIPELINE:
+        print(f"Pipeline mode, queue size {PIPELINE_QUEUE_SIZE}")
+        Pipeline(OUTPUT_FILE).run()
+    else:
+        consume(OUTPUT_FILE)
+
 if __name__ == '__main__':
     main()
@@ -15,10 +15,27 @@ echo "Benchmark Start Time: $START_TIME"
 echo "Log File: $LOG_FILE"
 echo "=========================================="
 
+# Watch the CDC pipeline for stalls while the benchmark runs (see KNOWN_ISSUES.md)
+INCIDENTS_FILE="$OUTPUT_DIR/INCIDENTS.jsonl"
+rm -f "$INCIDENTS_FILE" "$OUTPUT_DIR/WATCHDOG_EXITED.txt"
+python3 scripts/report-generator/watchdog.py --incidents "$INCIDENTS_FILE" &
+WATCHDOG_PID=$!
+trap 'kill $WATCHDOG_PID 2>/dev/null || true' EXIT
+
 docker compose exec -T hammerdb /scripts/entrypoint.sh run 2>&1 | tee "$LOG_FILE"
 
 END_TIME=$(date -u +%Y-%m-%dT%H:%M:%SZ)
 echo "$END_TIME" > "$OUTPUT_DIR/RUN_END_TIME.txt"
+if kill -0 $WATCHDOG_PID 2>/dev/null; then
+    kill $WATCHDOG_PID 2>/dev/null || true
+    wait $WATCHDOG_PID 2>/dev/null || true
+else
+    # The watchdog died during the run; the report marks it unwatched
+    WATCHDOG_STATUS=0
+    wait $WATCHDOG_PID 2>/dev/null || WATCHDOG_STATUS=$?
+    echo "$WATCHDOG_STATUS" > "$OUTPUT_DIR/WATCHDOG_EXITED.txt"
+    echo "Warning: the watchdog exited early (status $WATCHDOG_STATUS); the report will be marked unwatched"
+fi
 
 echo "=========================================="
 echo "Benchmark End Time: $END_TIME"
@@ -18,6 +18,19 @@ fi
 START_TIME=$(cat "$OUTPUT_DIR/RUN_START_TIME.txt")
 END_TIME=$(cat "$OUTPUT_DIR/RUN_END_TIME.txt")
 
+# Latest HammerDB run log and the watchdog's incidents, archived with the report
+RUN_LOG=$(ls -t "$OUTPUT_DIR"/RUN_LOG_*.txt 2>/dev/null | head -1)
+RUN_ARGS=()
+if [[ -n "$RUN_LOG" ]]; then
+    RUN_ARGS+=(--run-log "$RUN_LOG")
+fi
+if [[ -f "$OUTPUT_DIR/INCIDENTS.jsonl" ]]; then
+    RUN_ARGS+=(--incidents "$OUTPUT_DIR/INCIDENTS.jsonl")
+fi
+if [[ -f "$OUTPUT_DIR/WATCHDOG_EXITED.txt" ]]; then
+    RUN_ARGS+=(--unwatched)
+fi
+
 REPORT_DIR="$PROJECT_ROOT/reports/performance/$(date +%Y%m%d_%H%M)"
 mkdir -p "$REPORT_DIR"
 
@@ -54,6 +67,9 @@ FULL_METRICS=(
     --rate-of 'debezium_oracle_streaming_total_captured_dml'
     --rate-of 'kafka_topic_partition_current_offset{topic=~"oracle.*"}'
     --rate-of 'kafka_consumergroup_current_offset{consumergroup="file-writer"}'
+    --rate-of 'kafka_consumer_events_total'
+    --gauge-of 'histogram_quantile(0.95, sum by (le) (rate(kafka_consumer_e2e_latency_seconds_bucket[30s])))'
+    --gauge-of 'kafka_consumer_lag'
 )
 
 if [ "$PROFILE" = "full" ]; then
@@ -64,6 +80,7 @@ if [ "$PROFILE" = "full" ]; then
         --namespace "$NAMESPACE" \
         "${COMMON_METRICS[@]}" \
         "${FULL_METRICS[@]}" \
+        "${RUN_ARGS[@]}" \
         --output "$REPORT_DIR/report.html" \
         --title "K8s Performance Test $(date +%Y-%m-%d) ($PROFILE)"
 else
@@ -73,6 +90,7 @@ else
         --containers "$CONTAINERS" \
         --namespace "$NAMESPACE" \
         "${COMMON_METRICS[@]}" \
+        "${RUN_ARGS[@]}" \
         --output "$REPORT_DIR/report.html" \
         --title "K8s Performance Test $(date +%Y-%m-%d) ($PROFILE)"
 fi
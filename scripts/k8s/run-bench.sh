@@ -19,10 +19,27 @@ echo "Log File: $LOG_FILE"
 echo "Namespace: $NAMESPACE"
 echo "=========================================="
 
+# Watch the CDC pipeline for stalls while the benchmark runs (see KNOWN_ISSUES.md)
+INCIDENTS_FILE="$OUTPUT_DIR/INCIDENTS.jsonl"
+rm -f "$INCIDENTS_FILE" "$OUTPUT_DIR/WATCHDOG_EXITED.txt"
+python3 scripts/report-generator/watchdog.py --k8s --namespace "$NAMESPACE" --k8s-deployment "${RELEASE_NAME}-hammerdb" --incidents "$INCIDENTS_FILE" &
+WATCHDOG_PID=$!
+trap 'kill $WATCHDOG_PID 2>/dev/null || true' EXIT
+
 kubectl exec -n "$NAMESPACE" deployment/${RELEASE_NAME}-hammerdb -- /scripts/entrypoint.sh run 2>&1 | tee "$LOG_FILE"
 
 END_TIME=$(date -u +%Y-%m-%dT%H:%M:%SZ)
 echo "$END_TIME" > "$OUTPUT_DIR/RUN_END_TIME.txt"
+if kill -0 $WATCHDOG_PID 2>/dev/null; then
+    kill $WATCHDOG_PID 2>/dev/null || true
+    wait $WATCHDOG_PID 2>/dev/null || true
+else
+    # The watchdog died during the run; the report marks it unwatched
+    WATCHDOG_STATUS=0
+    wait $WATCHDOG_PID 2>/dev/null || WATCHDOG_STATUS=$?
+    echo "$WATCHDOG_STATUS" > "$OUTPUT_DIR/WATCHDOG_EXITED.txt"
+    echo "Warning: the watchdog exited early (status $WATCHDOG_STATUS); the report will be marked unwatched"
+fi
 
 echo "=========================================="
 echo "Benchmark End Time: $END_TIME"
@@ -0,0 +1,125 @@
+"""
+Self-contained run archives for offline re-rendering.
+
+Every report also writes report.npz next to its HTML: each Prometheus
+range query the report made (the PromQL and every returned series), the
+ReportConfig and the HammerDB run log. Samples are stored column-wise,
+one timestamp and one value array for all series, with per-series
+offsets in the metadata. Watchdog incidents during the run are kept
+too. `render --from-archive` replays the archived responses through the
+report generator, so a report, or a new view of it (another steady-state
+window, chart resolution or template), can be rebuilt after Prometheus
+is gone.
+
+Usage:
+    python generate_report.py render \
+        --from-archive reports/performance/20251220_2012/report.npz \
+        --output reports/performance/20251220_2012/report.html
+
+    # In Python, for ad-hoc analysis
+    meta, responses, run_log = load_archive(Path(".../report.npz"))
+"""
+
+import json
+import typing
+from dataclasses import asdict, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+ARCHIVE_FORMAT_VERSION = 1
+
+
+def config_to_dict(config) -> dict:
+    """A ReportConfig as JSON-serializable values."""
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in asdict(config).items()}
+
+
+def config_from_dict(config_class, values: dict, **overrides):
+    """Rebuild a ReportConfig; fields the class doesn't have are ignored."""
+    hints = typing.get_type_hints(config_class)
+    kwargs = {}
+    for f in fields(config_class):
+        if f.name not in values:
+            continue
+        value = values[f.name]
+        if isinstance(value, str) and datetime in (hints[f.name], *typing.get_args(hints[f.name])):
+            value = datetime.fromisoformat(value)
+        kwargs[f.name] = value
+    kwargs.update(overrides)
+    return config_class(**kwargs)
+
+
+def save_archive(path: Path, generator: str, config, responses: dict, run_log: Optional[Path] = None,
+                 incidents: Optional[list] = None):
+    """Write the range query responses, config, run log and watchdog incidents as a compressed npz."""
+    queries = []
+    timestamps, values = [], []
+    offset = 0
+    for query, data in responses.items():
+        series = []
+        for result in data.get("data", {}).get("result", []):
+            samples = result.get("values", [])
+            timestamps.append(np.array([s[0] for s in samples], dtype=float))
+            values.append(np.array([s[1] for s in samples], dtype=float))  # "NaN" -> NaN
+            series.append({"metric": result.get("metric", {}), "offset": offset, "length": len(samples)})
+            offset += len(samples)
+        queries.append({"query": query, "status": data.get("status"), "series": series})
+
+    meta = {
+        "version": ARCHIVE_FORMAT_VERSION,
+        "generator": generator,
+        "config": config_to_dict(config),
+        "queries": queries,
+        "run_log_name": run_log.name if run_log else None,
+        "incidents": incidents or [],
+    }
+    log_bytes = run_log.read_bytes() if run_log else b""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        np.savez_compressed(
+            f,
+            meta=np.array(json.dumps(meta)),
+            timestamps=np.concatenate(timestamps) if timestamps else np.empty(0),
+            values=np.concatenate(values) if values else np.empty(0),
+            run_log=np.frombuffer(log_bytes, dtype=np.uint8),
+        )
+    print(f"Run archive saved: {path}")
+
+
+def load_archive(path: Path) -> tuple[dict, dict, Optional[str]]:
+    """Load an archive: (metadata, query -> Prometheus response, run log text)."""
+    with np.load(path) as archive:
+        meta = json.loads(str(archive["meta"]))
+        if meta.get("version") != ARCHIVE_FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported archive format version {meta.get('version')}")
+        timestamps = archive["timestamps"].tolist()
+        values = archive["values"].tolist()
+        run_log = archive["run_log"].tobytes().decode(errors="replace") if meta["run_log_name"] else None
+
+    responses = {}
+    for entry in meta["queries"]:
+        results = []
+        for s in entry["series"]:
+            window = slice(s["offset"], s["offset"] + s["length"])
+            results.append({"metric": s["metric"], "values": [list(p) for p in zip(timestamps[window], values[window])]})
+        responses[entry["query"]] = {"status": entry["status"], "data": {"resultType": "matrix", "result": results}}
+    return meta, responses, run_log
+
+
+class ArchiveExecutor:
+    """Answers range queries from an archive instead of Prometheus."""
+
+    def __init__(self, responses: dict):
+        self.responses = responses
+
+    def query_prometheus(self, endpoint: str, params: dict) -> dict:
+        if endpoint != "/api/v1/query_range":
+            return {}
+        return self.responses.get(params["query"], {})
+
+    def close(self):
+        pass
@@ -0,0 +1,201 @@
+"""
+Run artifacts and baseline-vs-candidate comparison.
+
+Every report also writes report.json next to its HTML (save_run() in
+report_common.py): the full-precision series, the steady-state window and
+the metrics table. `compare` aligns two or more such runs on time since
+start, overlays their charts and tabulates each candidate's change
+against the baseline (the first run) with a moving-block bootstrap
+confidence interval.
+
+Usage:
+    python generate_report.py compare \
+        reports/performance/20251220_2012 reports/performance/20251221_0930 \
+        --output reports/performance/compare.html
+"""
+
+import argparse
+import json
+import math
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from jinja2 import Environment, FileSystemLoader
+
+from report_common import RUN_FORMAT_VERSION, format_number
+from stats import chart_values, in_window
+
+RUN_FILE = "report.json"
+
+# Series compared in the diff table: (series key, name suffix, unit)
+COMPARE_KEYS = [
+    ("rate_series", "", "/s"),
+    ("cpu_series", " CPU", "%"),
+    ("memory_series", " Memory", " MB"),
+]
+# Series overlaid as charts: (series key, chart title suffix, unit)
+CHART_KEYS = COMPARE_KEYS + [
+    ("network_rx_series", " Net RX", " B/s"),
+    ("network_tx_series", " Net TX", " B/s"),
+    ("total_series", "", ""),
+    ("gauge_series", "", ""),
+]
+
+
+def load_run(path: Path) -> dict:
+    """Load report.json, given the file or the report directory."""
+    if path.is_dir():
+        path = path / RUN_FILE
+    run = json.loads(path.read_text())
+    if run.get("version") != RUN_FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported run format version {run.get('version')}")
+    run["path"] = str(path)
+    run["label"] = path.parent.name if path.name == RUN_FILE else path.stem
+    run["start_ts"] = _parse_time(run["start_time"])
+    for series_list in run["series"].values():
+        for s in series_list:
+            s["timestamps"] = np.asarray(s["timestamps"], dtype=float)
+            s["values"] = np.asarray(s["values"], dtype=float)  # null -> NaN
+    return run
+
+
+def _parse_time(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def steady_values(run: dict, series: dict) -> np.ndarray:
+    """Finite samples of a series inside the run's steady-state window."""
+    steady = run.get("steady_state")
+    window = tuple(steady["window"]) if steady else None
+    _, values = in_window(series["timestamps"], series["values"], window)
+    return values[np.isfinite(values)]
+
+
+def block_bootstrap_means(values: np.ndarray, block: int, resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """Means of moving-block bootstrap resamples.
+
+    Consecutive samples are autocorrelated, so whole blocks are resampled
+    to keep the interval from being too narrow.
+    """
+    n = values.size
+    block = max(1, min(block, n))
+    blocks = math.ceil(n / block)
+    starts = rng.integers(0, n - block + 1, size=(resamples, blocks))
+    index = (starts[:, :, None] + np.arange(block)).reshape(resamples, -1)[:, :n]
+    return values[index].mean(axis=1)
+
+
+def compare_series(baseline: np.ndarray, candidate: np.ndarray, block: int, resamples: int,
+                   confidence: float, rng: np.random.Generator):
+    """Percent change of the candidate mean vs the baseline, with its CI."""
+    if baseline.size == 0 or candidate.size == 0 or baseline.mean() == 0:
+        return None
+    change = (candidate.mean() / baseline.mean() - 1) * 100
+    base_means = block_bootstrap_means(baseline, block, resamples, rng)
+    cand_means = block_bootstrap_means(candidate, block, resamples, rng)
+    valid = base_means != 0
+    changes = (cand_means[valid] / base_means[valid] - 1) * 100
+    tail = (100 - confidence) / 2
+    low, high = np.percentile(changes, [tail, 100 - tail])
+    return float(change), float(low), float(high)
+
+
+def build_comparison(runs: list[dict], block_seconds: float, resamples: int, confidence: float,
+                     seed: int) -> dict:
+    """Build the template data: run list, diff table and overlay charts."""
+    rng = np.random.default_rng(seed)
+    baseline = runs[0]
+
+    diff_table = []
+    for key, suffix, unit in COMPARE_KEYS:
+        for base_series in baseline["series"].get(key, []):
+            base_values = steady_values(baseline, base_series)
+            for run in runs[1:]:
+                match = next((s for s in run["series"].get(key, []) if s["name"] == base_series["name"]), None)
+                if match is None:
+                    continue
+                cand_values = steady_values(run, match)
+                block = max(1, int(round(block_seconds / min(baseline["step"], run["step"]))))
+                result = compare_series(base_values, cand_values, block, resamples, confidence, rng)
+                if result is None:
+                    continue
+                change, low, high = result
+                diff_table.append({
+                    "metric": f"{base_series['name']}{suffix}",
+                    "candidate": run["label"],
+                    "baseline_value": format_number(float(base_values.mean()), unit),
+                    "candidate_value": format_number(float(cand_values.mean()), unit),
+                    "change": f"{change:+.1f}%",
+                    "ci": f"[{low:+.1f}%, {high:+.1f}%]",
+                    # The interval excludes zero: the change is not noise
+                    "significant": low > 0 or high < 0,
+                })
+
+    charts = []
+    for key, suffix, unit in CHART_KEYS:
+        names = []
+        for run in runs:
+            for s in run["series"].get(key, []):
+                if s["name"] not in names:
+                    names.append(s["name"])
+        for name in names:
+            datasets = []
+            for run in runs:
+                s = next((s for s in run["series"].get(key, []) if s["name"] == name), None)
+                if s is None:
+                    continue
+                # Align on minutes since the run's start
+                minutes = np.round((s["timestamps"] - run["start_ts"]) / 60, 3)
+                # Gauges keep millisecond precision for latency quantiles
+                values = chart_values(s["values"], 3 if key == "gauge_series" else 2)
+                datasets.append({"label": run["label"], "points": [[m, v] for m, v in zip(minutes.tolist(), values)]})
+            charts.append({"title": f"{name}{suffix}", "unit": unit.strip(), "datasets": datasets})
+
+    return {
+        "runs": [{
+            "label": run["label"],
+            "title": run["title"],
+            "start_time": run["start_time"],
+            "steady_state": run.get("steady_state"),
+            "incidents": run.get("incidents", []),
+            "unwatched": run.get("unwatched", False),
+        } for run in runs],
+        "baseline": baseline["label"],
+        "diff_table": diff_table,
+        "charts": charts,
+        "confidence": confidence,
+    }
+
+
+def compare_main(argv: list[str]):
+    parser = argparse.ArgumentParser(prog="generate_report.py compare",
+                                     description="Compare report runs against a baseline (the first run)")
+    parser.add_argument("runs", nargs="+", help=f"Report directories or {RUN_FILE} files; the first is the baseline")
+    parser.add_argument("--output", required=True, help="Output HTML file path")
+    parser.add_argument("--title", default="Performance Comparison", help="Report title")
+    parser.add_argument("--resamples", type=int, default=2000, help="Bootstrap resamples")
+    parser.add_argument("--block-seconds", type=float, default=60,
+                        help="Bootstrap block length; samples closer than this are resampled together")
+    parser.add_argument("--confidence", type=float, default=95, help="Confidence level of the interval (%%)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed, for reproducible intervals")
+    args = parser.parse_args(argv)
+    if len(args.runs) < 2:
+        parser.error("compare needs a baseline and at least one candidate")
+
+    try:
+        runs = [load_run(Path(path)) for path in args.runs]
+    except (OSError, ValueError) as e:
+        print(f"Cannot load run: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    data = build_comparison(runs, args.block_seconds, args.resamples, args.confidence, args.seed)
+    data["title"] = args.title
+
+    env = Environment(loader=FileSystemLoader(Path(__file__).parent))
+    html = env.get_template("compare.html.j2").render(**data)
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(html)
+    print(f"Comparison generated: {output_path}")
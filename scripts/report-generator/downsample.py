@@ -0,0 +1,95 @@
+"""
+Chart payloads: LTTB downsampling and compact series encoding.
+
+Charts only need enough points to keep the shape of a series, so each
+series is reduced with Largest-Triangle-Three-Buckets before it is
+embedded in the report; summary statistics are computed from the full
+series beforehand. Encoded series are delta-encoded integers:
+
+    {"d": digits, "i": [sample index deltas], "v": [value deltas, null = gap]}
+
+Sample indices count steps from the report start, and values are scaled
+by 10**digits. decodeSeries() in charts.html.j2 reverses this.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points Largest-Triangle-Three-Buckets keeps."""
+    n = x.size
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # First and last points are always kept; the rest are split into
+    # threshold - 2 buckets, each contributing the point that forms the
+    # largest triangle with the previous pick and the next bucket's mean
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        next_hi = edges[b + 2] if b + 2 < edges.size else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[b + 1] = a
+    return selected
+
+
+def encode_series(timestamps, values, start_ts: float, step: float, digits: int,
+                  max_points: Optional[int] = None) -> dict:
+    """Encode a series for a chart, downsampled to about max_points points.
+
+    Missing samples split the series into segments; each segment is
+    downsampled on its own, with a share of max_points proportional to
+    its length, and a gap marker is kept between segments.
+    """
+    ts = np.asarray(timestamps, dtype=float)
+    v = np.asarray(values, dtype=float)
+    index = np.rint((ts - start_ts) / step).astype(np.int64)
+    finite = np.isfinite(v)
+    index, v = index[finite], v[finite]
+
+    # Segments of consecutive samples
+    breaks = np.flatnonzero(np.diff(index) > 1) + 1
+    segments = list(zip(np.split(index, breaks), np.split(v, breaks)))
+
+    out_index, out_value = [], []
+    for n, (seg_index, seg_values) in enumerate(segments):
+        if seg_index.size == 0:
+            continue
+        if n > 0:
+            # Gap marker right after the previous segment
+            out_index.append(np.array([out_index[-1][-1] + 1]))
+            out_value.append(np.array([np.nan]))
+        if max_points:
+            share = max(3, int(round(max_points * seg_index.size / v.size)))
+            keep = lttb(seg_index.astype(float), seg_values, share)
+            seg_index, seg_values = seg_index[keep], seg_values[keep]
+        out_index.append(seg_index)
+        out_value.append(seg_values)
+
+    if not out_index:
+        return {"d": digits, "i": [], "v": []}
+    index = np.concatenate(out_index)
+    v = np.concatenate(out_value)
+
+    gaps = ~np.isfinite(v)
+    scaled = np.rint(np.where(gaps, 0, v) * 10 ** digits).astype(np.int64)
+    # Value deltas run over real points only; gap markers don't reset them
+    value_deltas = np.zeros_like(scaled)
+    real = np.flatnonzero(~gaps)
+    value_deltas[real] = np.diff(scaled[real], prepend=0)
+    encoded_values = value_deltas.astype(object)
+    encoded_values[gaps] = None
+
+    return {
+        "d": digits,
+        "i": np.diff(index, prepend=0).tolist(),
+        "v": encoded_values.tolist(),
+    }
@@ -2,7 +2,8 @@
 """
 Performance Report Generator
 
-Generates HTML performance reports by querying Prometheus metrics via Docker.
+Generates HTML performance reports by querying Prometheus metrics, either
+directly over HTTP or via Docker/kubectl exec.
 
 Usage:
     python generate_report.py \
@@ -11,528 +12,202 @@ Usage:
         --containers oracle,olr \
         --rate-of 'dml_ops{filter="out"}' \
         --total-of 'bytes_sent' \
+        --gauge-of 'kafka_consumer_lag' \
         --output reports/performance/test/charts.html
+
+Each report also saves report.json next to the HTML. Compare runs with:
+
+    python generate_report.py compare BASELINE_DIR CANDIDATE_DIR... --output compare.html
+
+By default queries go straight to Prometheus over a pooled HTTP session
+when it is reachable (at --prometheus-url, or through one kubectl
+port-forward with --k8s), and fall back to curl via docker compose exec
+(or kubectl exec) otherwise.
+
+The Prometheus client, report generation and rendering are shared with
+k8s_report.py in report_common.py.
 """
 
 import argparse
-import json
-import subprocess
+import re
 import sys
-from dataclasses import dataclass, field
-from datetime import datetime
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
-from urllib.parse import quote
 
-from jinja2 import Environment, FileSystemLoader
+from compare import compare_main
+from report_common import (
+    BaseReportConfig,
+    BaseReportGenerator,
+    MetricSeries,
+    add_report_arguments,
+    create_executor,
+    docker_exec_command,
+    kubectl_exec_command,
+    parse_report_args,
+    promql_regex_escape,
+    render_main,
+    report_config_args,
+    sum_series,
+    write_report,
+)
 
 
 @dataclass
-class MetricSeries:
-    """A time series of metric values."""
-    name: str
-    labels: dict
-    timestamps: list[float]
-    values: list[float]
-
-
-@dataclass
-class ReportConfig:
+class ReportConfig(BaseReportConfig):
     """Configuration for report generation."""
-    start_time: datetime
-    end_time: datetime
-    step: int = 30  # seconds
-    prometheus_url: str = "http://prometheus:9090"
-    containers: list[str] = field(default_factory=list)
-    rate_of_metrics: list[str] = field(default_factory=list)  # e.g., ['dml_ops{filter="out"}']
-    total_of_metrics: list[str] = field(default_factory=list)  # e.g., ['bytes_sent']
-    title: str = "Performance Test Report"
     docker_service: str = "hammerdb"  # Service to exec into for queries
     # Kubernetes mode settings
     k8s_mode: bool = False
     k8s_namespace: str = "oracle-cdc"
     k8s_deployment: str = "oracle-cdc-hammerdb"
+    http_url: str = "http://localhost:9090"  # Prometheus URL as seen from this host (Docker mode)
 
 
-class QueryExecutor:
-    """Executes queries via docker compose exec or kubectl exec."""
-
-    def __init__(self, config: ReportConfig):
-        self.config = config
-
-    def _run_command(self, cmd: list[str]) -> str:
-        """Run a command and return stdout."""
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-            if result.returncode != 0:
-                print(f"Command failed: {' '.join(cmd)}", file=sys.stderr)
-                print(f"stderr: {result.stderr}", file=sys.stderr)
-                return ""
-            return result.stdout
-        except subprocess.TimeoutExpired:
-            print(f"Command timed out: {' '.join(cmd)}", file=sys.stderr)
-            return ""
-        except Exception as e:
-            print(f"Command error: {e}", file=sys.stderr)
-            return ""
-
-    def query_prometheus(self, endpoint: str, params: dict) -> dict:
-        """Query Prometheus and return JSON response."""
-        # Build curl command
-        query_parts = []
-        for k, v in params.items():
-            query_parts.append(f"{k}={quote(str(v), safe='')}")
-        query_string = "&".join(query_parts)
-        url = f"{self.config.prometheus_url}{endpoint}?{query_string}"
-
-        curl_cmd = f"curl -s '{url}'"
-
-        # Use kubectl if k8s_mode is enabled, otherwise use docker compose
-        if getattr(self.config, 'k8s_mode', False):
-            cmd = [
-                "kubectl", "exec", "-n", self.config.k8s_namespace,
-                f"deployment/{self.config.k8s_deployment}", "--",
-                "sh", "-c", curl_cmd
-            ]
-        else:
-            cmd = ["docker", "compose", "exec", "-T", self.config.docker_service, "sh", "-c", curl_cmd]
-
-        output = self._run_command(cmd)
-        if not output:
-            return {}
-
-        try:
-            return json.loads(output)
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error: {e}", file=sys.stderr)
-            print(f"Raw output: {output[:500]}", file=sys.stderr)
-            return {}
-
-
-class PrometheusClient:
-    """Client for querying Prometheus."""
-
-    def __init__(self, executor: QueryExecutor):
-        self.executor = executor
-
-    def query_range(self, query: str, start: float, end: float, step: int) -> list[MetricSeries]:
-        """Execute a range query and return metric series."""
-        params = {
-            "query": query,
-            "start": start,
-            "end": end,
-            "step": step,
-        }
-
-        data = self.executor.query_prometheus("/api/v1/query_range", params)
-
-        if data.get("status") != "success":
-            return []
-
-        series_list = []
-        for result in data.get("data", {}).get("result", []):
-            metric = result.get("metric", {})
-            values = result.get("values", [])
-
-            timestamps = [v[0] for v in values]
-            metric_values = [float(v[1]) if v[1] != "NaN" else 0.0 for v in values]
-
-            series = MetricSeries(
-                name=metric.get("__name__", "unknown"),
-                labels={k: v for k, v in metric.items() if k != "__name__"},
-                timestamps=timestamps,
-                values=metric_values,
-            )
-            series_list.append(series)
-
-        return series_list
-
-    def query_instant(self, query: str) -> list[dict]:
-        """Execute an instant query."""
-        params = {"query": query}
-        data = self.executor.query_prometheus("/api/v1/query", params)
-
-        if data.get("status") != "success":
-            return []
-
-        return data.get("data", {}).get("result", [])
-
-
-class ReportGenerator:
+class ReportGenerator(BaseReportGenerator):
     """Generates performance reports from Prometheus metrics."""
 
-    def __init__(self, config: ReportConfig):
-        self.config = config
-        executor = QueryExecutor(config)
-        self.client = PrometheusClient(executor)
-        self.start_ts = config.start_time.timestamp()
-        self.end_ts = config.end_time.timestamp()
-
-    def _format_time_labels(self, timestamps: list[float]) -> list[str]:
-        """Convert timestamps to readable time labels."""
-        if not timestamps:
-            return []
-        from datetime import timezone
-        return [datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%M:%S") for ts in timestamps]
-
-    def get_container_cpu(self, container_name: str) -> Optional[MetricSeries]:
-        """Get CPU usage percentage for a container."""
-        if self.config.k8s_mode:
-            # For k8s, use pod name pattern matching
-            query = f'sum(rate(container_cpu_usage_seconds_total{{namespace="{self.config.k8s_namespace}", pod=~"oracle-cdc-{container_name}.*", container!=""}}[30s]))*100'
-        else:
-            query = f'sum(rate(container_cpu_usage_seconds_total{{name="{container_name}"}}[30s]))*100'
-        series_list = self.client.query_range(query, self.start_ts, self.end_ts, self.config.step)
+    name = "generate_report"
 
-        if series_list:
-            series = series_list[0]
-            series.name = container_name.replace("oracle-cdc-test-", "").replace("-1", "")
-            return series
-        return None
+    def create_executor(self):
+        """Pick the query backend; the exec backends are the fallback."""
+        config = self.config
+        if config.k8s_mode:
+            return create_executor(config.backend, kubectl_exec_command(config.k8s_namespace, config.k8s_deployment),
+                                   config.prometheus_url, config.query_workers, namespace=config.k8s_namespace)
+        return create_executor(config.backend, docker_exec_command(config.docker_service),
+                               config.prometheus_url, config.query_workers, http_url=config.http_url)
 
-    def get_container_memory(self, container_name: str) -> Optional[MetricSeries]:
-        """Get memory usage in MB for a container."""
-        if self.config.k8s_mode:
-            query = f'sum(container_memory_usage_bytes{{namespace="{self.config.k8s_namespace}", pod=~"oracle-cdc-{container_name}.*", container!=""}})/1024/1024'
-        else:
-            query = f'sum(container_memory_usage_bytes{{name="{container_name}"}})/1024/1024'
-        series_list = self.client.query_range(query, self.start_ts, self.end_ts, self.config.step)
+    def cache_source(self) -> str:
+        return "docker" if not self.config.k8s_mode else f"k8s/{self.config.k8s_namespace}"
 
-        if series_list:
-            series = series_list[0]
-            series.name = container_name.replace("oracle-cdc-test-", "").replace("-1", "")
-            return series
-        return None
+    def cache_base_url(self) -> str:
+        # Docker mode queries Prometheus at the host-side URL
+        return self.config.prometheus_url if self.config.k8s_mode else self.config.http_url
 
-    def get_container_network_rx(self, container_name: str) -> Optional[MetricSeries]:
-        """Get network receive rate in bytes/sec for a container."""
-        query = f'sum(rate(container_network_receive_bytes_total{{name="{container_name}"}}[30s]))'
-        series_list = self.client.query_range(query, self.start_ts, self.end_ts, self.config.step)
-
-        if series_list:
-            series = series_list[0]
-            series.name = container_name.replace("oracle-cdc-test-", "").replace("-1", "")
-            return series
-        return None
-
-    def get_container_network_tx(self, container_name: str) -> Optional[MetricSeries]:
-        """Get network transmit rate in bytes/sec for a container."""
-        query = f'sum(rate(container_network_transmit_bytes_total{{name="{container_name}"}}[30s]))'
-        series_list = self.client.query_range(query, self.start_ts, self.end_ts, self.config.step)
-
-        if series_list:
-            series = series_list[0]
-            series.name = container_name.replace("oracle-cdc-test-", "").replace("-1", "")
-            return series
-        return None
-
-    def get_container_fs_reads(self, container_name: str) -> Optional[MetricSeries]:
-        """Get filesystem read rate in bytes/sec for a container."""
-        query = f'sum(rate(container_fs_reads_bytes_total{{name="{container_name}"}}[30s]))'
-        series_list = self.client.query_range(query, self.start_ts, self.end_ts, self.config.step)
-
-        if series_list:
-            series = series_list[0]
-            series.name = container_name.replace("oracle-cdc-test-", "").replace("-1", "")
-            return series
-        return None
-
-    def get_container_fs_writes(self, container_name: str) -> Optional[MetricSeries]:
-        """Get filesystem write rate in bytes/sec for a container."""
-        query = f'sum(rate(container_fs_writes_bytes_total{{name="{container_name}"}}[30s]))'
-        series_list = self.client.query_range(query, self.start_ts, self.end_ts, self.config.step)
-
-        if series_list:
-            series = series_list[0]
-            series.name = container_name.replace("oracle-cdc-test-", "").replace("-1", "")
-            return series
-        return None
-
-    def get_metric_rate(self, metric_expr: str) -> Optional[MetricSeries]:
-        """Get rate of a metric expression (e.g., 'dml_ops{filter="out"}')."""
-        query = f'sum(rate({metric_expr}[30s]))'
-        series_list = self.client.query_range(query, self.start_ts, self.end_ts, self.config.step)
-
-        if series_list:
-            series = series_list[0]
-            series.name = metric_expr
-            return series
-        return None
-
-    def get_metric_total(self, metric_expr: str) -> Optional[MetricSeries]:
-        """Get total (raw sum) of a metric expression (e.g., 'bytes_sent')."""
-        query = f'sum({metric_expr})'
-        series_list = self.client.query_range(query, self.start_ts, self.end_ts, self.config.step)
-
-        if series_list:
-            series = series_list[0]
-            series.name = metric_expr
-            return series
-        return None
-
-    def _format_number(self, value: float, unit: str = "") -> str:
-        """Format a number with appropriate precision and unit."""
-        if value >= 1_000_000:
-            return f"{value/1_000_000:,.1f}M{unit}"
-        elif value >= 1_000:
-            return f"{value/1_000:,.1f}K{unit}"
-        elif value >= 100:
-            return f"{value:,.0f}{unit}"
-        elif value >= 1:
-            return f"{value:,.1f}{unit}"
-        else:
-            return f"{value:,.2f}{unit}"
-
-    def generate(self) -> dict:
-        """Generate all report data."""
-        data = {
-            "title": self.config.title,
-            "start_time": self.config.start_time.strftime("%Y-%m-%d %H:%M:%S UTC"),
-            "end_time": self.config.end_time.strftime("%Y-%m-%d %H:%M:%S UTC"),
-            "duration_minutes": int((self.end_ts - self.start_ts) / 60),
-            "time_labels": [],
-            "cpu_series": [],
-            "memory_series": [],
-            "network_rx_series": [],
-            "network_tx_series": [],
-            "fs_read_series": [],
-            "fs_write_series": [],
-            "rate_series": [],
-            "total_series": [],
-            "metrics_table": [],
-        }
-
-        # Get container metrics
+    def container_queries(self) -> tuple[list[str], list[tuple]]:
+        # Normalize container names based on mode
+        container_names = []
         for container in self.config.containers:
-            # Normalize container name based on mode
             if self.config.k8s_mode:
                 # For k8s, just use the container name directly (get_container_* handles pod pattern)
-                container_full = container
+                container_names.append(container)
             elif not container.startswith("oracle-cdc-test-"):
-                container_full = f"oracle-cdc-test-{container}-1"
+                container_names.append(f"oracle-cdc-test-{container}-1")
             else:
-                container_full = container
-
-            # CPU
-            cpu_series = self.get_container_cpu(container_full)
-            if cpu_series:
-                data["cpu_series"].append({
-                    "name": cpu_series.name,
-                    "values": [round(v, 2) for v in cpu_series.values],
-                })
-                if not data["time_labels"]:
-                    data["time_labels"] = self._format_time_labels(cpu_series.timestamps)
-
-            # Memory
-            mem_series = self.get_container_memory(container_full)
-            if mem_series:
-                data["memory_series"].append({
-                    "name": mem_series.name,
-                    "values": [round(v, 1) for v in mem_series.values],
-                })
-
-            # Network RX
-            net_rx_series = self.get_container_network_rx(container_full)
-            if net_rx_series:
-                data["network_rx_series"].append({
-                    "name": net_rx_series.name,
-                    "values": [round(v, 1) for v in net_rx_series.values],
-                })
-
-            # Network TX
-            net_tx_series = self.get_container_network_tx(container_full)
-            if net_tx_series:
-                data["network_tx_series"].append({
-                    "name": net_tx_series.name,
-                    "values": [round(v, 1) for v in net_tx_series.values],
-                })
-
-            # Filesystem Reads
-            fs_read_series = self.get_container_fs_reads(container_full)
-            if fs_read_series:
-                data["fs_read_series"].append({
-                    "name": fs_read_series.name,
-                    "values": [round(v, 1) for v in fs_read_series.values],
-                })
-
-            # Filesystem Writes
-            fs_write_series = self.get_container_fs_writes(container_full)
-            if fs_write_series:
-                data["fs_write_series"].append({
-                    "name": fs_write_series.name,
-                    "values": [round(v, 1) for v in fs_write_series.values],
-                })
-
-        # Get rate metrics (rate charts)
-        for metric_expr in self.config.rate_of_metrics:
-            rate_series = self.get_metric_rate(metric_expr)
-            if rate_series:
-                data["rate_series"].append({
-                    "name": metric_expr,
-                    "values": [round(v, 1) for v in rate_series.values],
-                })
-
-        # Get total metrics (raw value charts)
-        for metric_expr in self.config.total_of_metrics:
-            total_series = self.get_metric_total(metric_expr)
-            if total_series:
-                data["total_series"].append({
-                    "name": metric_expr,
-                    "values": [round(v, 1) for v in total_series.values],
-                })
-
-        # Build metrics table
-        # CPU metrics
-        for series in data["cpu_series"]:
-            values = [v for v in series["values"] if v > 0]
-            if values:
-                data["metrics_table"].append({
-                    "name": f"{series['name']} CPU",
-                    "min": self._format_number(min(values), "%"),
-                    "avg": self._format_number(sum(values) / len(values), "%"),
-                    "max": self._format_number(max(values), "%"),
-                    "total": "-",
-                })
-
-        # Memory metrics
-        for series in data["memory_series"]:
-            values = series["values"]
-            if values:
-                data["metrics_table"].append({
-                    "name": f"{series['name']} Memory",
-                    "min": self._format_number(min(values), " MB"),
-                    "avg": self._format_number(sum(values) / len(values), " MB"),
-                    "max": self._format_number(max(values), " MB"),
-                    "total": "-",
-                })
-
-        # Network RX metrics (bytes/sec)
-        for series in data["network_rx_series"]:
-            values = [v for v in series["values"] if v > 0]
-            if values:
-                duration_sec = self.end_ts - self.start_ts
-                estimated_total = (sum(values) / len(values)) * duration_sec
-                data["metrics_table"].append({
-                    "name": f"{series['name']} Net RX",
-                    "min": self._format_number(min(values), " B/s"),
-                    "avg": self._format_number(sum(values) / len(values), " B/s"),
-                    "max": self._format_number(max(values), " B/s"),
-                    "total": f"~{self._format_number(estimated_total, ' B')}",
-                })
-
-        # Network TX metrics (bytes/sec)
-        for series in data["network_tx_series"]:
-            values = [v for v in series["values"] if v > 0]
-            if values:
-                duration_sec = self.end_ts - self.start_ts
-                estimated_total = (sum(values) / len(values)) * duration_sec
-                data["metrics_table"].append({
-                    "name": f"{series['name']} Net TX",
-                    "min": self._format_number(min(values), " B/s"),
-                    "avg": self._format_number(sum(values) / len(values), " B/s"),
-                    "max": self._format_number(max(values), " B/s"),
-                    "total": f"~{self._format_number(estimated_total, ' B')}",
-                })
-
-        # Filesystem read metrics (bytes/sec)
-        for series in data["fs_read_series"]:
-            values = [v for v in series["values"] if v > 0]
-            if values:
-                duration_sec = self.end_ts - self.start_ts
-                estimated_total = (sum(values) / len(values)) * duration_sec
-                data["metrics_table"].append({
-                    "name": f"{series['name']} FS Read",
-                    "min": self._format_number(min(values), " B/s"),
-                    "avg": self._format_number(sum(values) / len(values), " B/s"),
-                    "max": self._format_number(max(values), " B/s"),
-                    "total": f"~{self._format_number(estimated_total, ' B')}",
-                })
-
-        # Filesystem write metrics (bytes/sec)
-        for series in data["fs_write_series"]:
-            values = [v for v in series["values"] if v > 0]
-            if values:
-                duration_sec = self.end_ts - self.start_ts
-                estimated_total = (sum(values) / len(values)) * duration_sec
-                data["metrics_table"].append({
-                    "name": f"{series['name']} FS Write",
-                    "min": self._format_number(min(values), " B/s"),
-                    "avg": self._format_number(sum(values) / len(values), " B/s"),
-                    "max": self._format_number(max(values), " B/s"),
-                    "total": f"~{self._format_number(estimated_total, ' B')}",
-                })
-
-        # Rate metrics (events/sec)
-        for series in data["rate_series"]:
-            values = [v for v in series["values"] if v > 0]
-            if values:
-                # Estimate total by avg_rate * duration
-                duration_sec = self.end_ts - self.start_ts
-                estimated_total = (sum(values) / len(values)) * duration_sec
-                data["metrics_table"].append({
-                    "name": series["name"],
-                    "min": self._format_number(min(values), "/s"),
-                    "avg": self._format_number(sum(values) / len(values), "/s"),
-                    "max": self._format_number(max(values), "/s"),
-                    "total": f"~{self._format_number(estimated_total)}",
-                })
-
-        # Total metrics (counters)
-        for series in data["total_series"]:
-            values = series["values"]
-            if values:
-                delta = max(values) - min(values)
-                data["metrics_table"].append({
-                    "name": series["name"],
-                    "min": self._format_number(min(values)),
-                    "avg": self._format_number(sum(values) / len(values)),
-                    "max": self._format_number(max(values)),
-                    "total": f"+{self._format_number(delta)}",
-                })
-
-        return data
-
-
-def render_report(data: dict, template_dir: Path, output_path: Path):
-    """Render the report using Jinja2 template."""
-    env = Environment(loader=FileSystemLoader(template_dir))
-    template = env.get_template("charts.html.j2")
-
-    html = template.render(**data)
-
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(html)
-    print(f"Report generated: {output_path}")
+                container_names.append(container)
+
+        return container_names, [
+            ("cpu_series", self.get_container_cpu, 2),
+            ("memory_series", self.get_container_memory, 1),
+            ("network_rx_series", self.get_container_network_rx, 1),
+            ("network_tx_series", self.get_container_network_tx, 1),
+            ("fs_read_series", self.get_container_fs_reads, 1),
+            ("fs_write_series", self.get_container_fs_writes, 1),
+        ]
+
+    def _container_selector(self, container_names: list[str], label: str) -> tuple[str, dict[str, str]]:
+        """Build one label matcher covering all containers.
+
+        Returns the PromQL matcher and, per container, the regex its label
+        values must fully match. Pods are matched by name prefix.
+        """
+        if label == "pod":
+            matchers = {name: f"oracle-cdc-{promql_regex_escape(name)}.*" for name in container_names}
+        else:
+            matchers = {name: promql_regex_escape(name) for name in container_names}
+        alternation = "|".join(matchers.values()).replace("\\", "\\\\")
+        return f'{label}=~"{alternation}"', matchers
+
+    def _query_by_container(self, query: str, label: str, matchers: dict[str, str]) -> dict[str, MetricSeries]:
+        """Run one query grouped by label and split the result per container.
+
+        Series of several label values matching one container (e.g. pods of
+        one deployment) are summed, as a per-container sum() would.
+        """
+        series_list = self.client.query_range(query, self.start_ts, self.end_ts, self.config.step)
+
+        result = {}
+        for container_name, pattern in matchers.items():
+            regex = re.compile(pattern)
+            matching = [s for s in series_list if regex.fullmatch(s.labels.get(label, ""))]
+            if matching:
+                series = sum_series(matching)
+                series.name = container_name.replace("oracle-cdc-test-", "").replace("-1", "")
+                result[container_name] = series
+        return result
+
+    def get_container_cpu(self, container_names: list[str]) -> dict[str, MetricSeries]:
+        """Get CPU usage percentage per container."""
+        if self.config.k8s_mode:
+            # For k8s, use pod name pattern matching
+            selector, matchers = self._container_selector(container_names, "pod")
+            query = f'sum by (pod) (rate(container_cpu_usage_seconds_total{{namespace="{self.config.k8s_namespace}", {selector}, container!=""}}[30s]))*100'
+            return self._query_by_container(query, "pod", matchers)
+        selector, matchers = self._container_selector(container_names, "name")
+        query = f'sum by (name) (rate(container_cpu_usage_seconds_total{{{selector}}}[30s]))*100'
+        return self._query_by_container(query, "name", matchers)
+
+    def get_container_memory(self, container_names: list[str]) -> dict[str, MetricSeries]:
+        """Get memory usage in MB per container."""
+        if self.config.k8s_mode:
+            selector, matchers = self._container_selector(container_names, "pod")
+            query = f'sum by (pod) (container_memory_usage_bytes{{namespace="{self.config.k8s_namespace}", {selector}, container!=""}})/1024/1024'
+            return self._query_by_container(query, "pod", matchers)
+        selector, matchers = self._container_selector(container_names, "name")
+        query = f'sum by (name) (container_memory_usage_bytes{{{selector}}})/1024/1024'
+        return self._query_by_container(query, "name", matchers)
+
+    def get_container_network_rx(self, container_names: list[str]) -> dict[str, MetricSeries]:
+        """Get network receive rate in bytes/sec per container."""
+        selector, matchers = self._container_selector(container_names, "name")
+        query = f'sum by (name) (rate(container_network_receive_bytes_total{{{selector}}}[30s]))'
+        return self._query_by_container(query, "name", matchers)
+
+    def get_container_network_tx(self, container_names: list[str]) -> dict[str, MetricSeries]:
+        """Get network transmit rate in bytes/sec per container."""
+        selector, matchers = self._container_selector(container_names, "name")
+        query = f'sum by (name) (rate(container_network_transmit_bytes_total{{{selector}}}[30s]))'
+        return self._query_by_container(query, "name", matchers)
+
+    def get_container_fs_reads(self, container_names: list[str]) -> dict[str, MetricSeries]:
+        """Get filesystem read rate in bytes/sec per container."""
+        selector, matchers = self._container_selector(container_names, "name")
+        query = f'sum by (name) (rate(container_fs_reads_bytes_total{{{selector}}}[30s]))'
+        return self._query_by_container(query, "name", matchers)
+
+    def get_container_fs_writes(self, container_names: list[str]) -> dict[str, MetricSeries]:
+        """Get filesystem write rate in bytes/sec per container."""
+        selector, matchers = self._container_selector(container_names, "name")
+        query = f'sum by (name) (rate(container_fs_writes_bytes_total{{{selector}}}[30s]))'
+        return self._query_by_container(query, "name", matchers)
 
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Generate performance report from Prometheus metrics")
-    parser.add_argument("--start", required=True, help="Start time (ISO format, e.g., 2025-12-20T20:12:00Z)")
-    parser.add_argument("--end", required=True, help="End time (ISO format)")
-    parser.add_argument("--containers", required=True, help="Comma-separated list of container names (e.g., oracle,olr)")
-    parser.add_argument("--rate-of", action="append", dest="rate_of_metrics", default=[],
-                        help="Metric expression for rate chart (can be specified multiple times, e.g., --rate-of='dml_ops{filter=\"out\"}')")
-    parser.add_argument("--total-of", action="append", dest="total_of_metrics", default=[],
-                        help="Metric expression for total (raw value) chart (can be specified multiple times, e.g., --total-of='bytes_sent')")
+    add_report_arguments(parser)
     parser.add_argument("--prometheus", default="http://prometheus:9090", help="Prometheus URL (from inside Docker network)")
-    parser.add_argument("--output", required=True, help="Output HTML file path")
-    parser.add_argument("--title", default="Performance Test Report", help="Report title")
-    parser.add_argument("--step", type=int, default=30, help="Query step in seconds")
+    parser.add_argument("--backend", choices=["auto", "http", "exec"], default="auto",
+                        help="Query backend: http queries Prometheus directly (via kubectl port-forward with --k8s), "
+                             "exec runs curl via docker compose/kubectl, auto uses http when reachable and falls back to exec")
+    parser.add_argument("--prometheus-url", default="http://localhost:9090",
+                        help="Prometheus URL for the http backend (from this host, Docker mode)")
     parser.add_argument("--service", default="hammerdb", help="Docker Compose service to exec into for queries")
     # Kubernetes mode options
     parser.add_argument("--k8s", action="store_true", help="Use kubectl instead of docker compose")
     parser.add_argument("--k8s-namespace", default="oracle-cdc", help="Kubernetes namespace")
     parser.add_argument("--k8s-deployment", default="oracle-cdc-hammerdb", help="Kubernetes deployment to exec into")
-
-    return parser.parse_args()
+    return parse_report_args(parser)
 
 
 def main():
-    args = parse_args()
+    if sys.argv[1:2] == ["compare"]:
+        compare_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["render"]:
+        render_main(sys.argv[2:], ReportConfig, ReportGenerator)
+        return
 
-    # Parse times
-    start_time = datetime.fromisoformat(args.start.replace("Z", "+00:00"))
-    end_time = datetime.fromisoformat(args.end.replace("Z", "+00:00"))
+    args = parse_args()
 
     # Set prometheus URL based on mode
     if args.k8s:
@@ -541,28 +216,17 @@ def main():
         prometheus_url = args.prometheus
 
     config = ReportConfig(
-        start_time=start_time,
-        end_time=end_time,
-        step=args.step,
+        **report_config_args(args),
         prometheus_url=prometheus_url,
-        containers=[c.strip() for c in args.containers.split(",")],
-        rate_of_metrics=args.rate_of_metrics,
-        total_of_metrics=args.total_of_metrics,
-        title=args.title,
         docker_service=args.service,
         k8s_mode=args.k8s,
         k8s_namespace=args.k8s_namespace,
         k8s_deployment=args.k8s_deployment,
+        backend=args.backend,
+        http_url=args.prometheus_url,
     )
 
-    generator = ReportGenerator(config)
-    data = generator.generate()
-
-    # Find template directory (same directory as this script)
-    script_dir = Path(__file__).parent
-    output_path = Path(args.output)
-
-    render_report(data, script_dir, output_path)
+    write_report(ReportGenerator(config), Path(args.output), Path(args.run_log) if args.run_log else None)
 
 
 if __name__ == "__main__":
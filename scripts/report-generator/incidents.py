@@ -0,0 +1,76 @@
+"""
+Pipeline incident records, written by watchdog.py and shown in reports.
+
+Incidents are appended to a JSONL file, one event per line:
+
+    {"time": "...Z", "ts": 1766261520.0, "event": "start", "rule": "confirm-stall",
+     "description": "...", "value": 1.2e9}
+    {"time": "...Z", "ts": 1766261580.0, "event": "end", "rule": "confirm-stall"}
+    {"time": "...Z", "ts": 1766261590.0, "event": "stop"}
+
+"stop" is written when the watchdog exits; incidents still open then end
+there. load_incidents() pairs the events back into incidents.
+"""
+
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+
+class IncidentLog:
+    """Appends incident events to a JSONL file, flushed per event."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    def write(self, event: str, ts: float, **fields):
+        record = {
+            "time": datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "ts": ts,
+            "event": event,
+            **fields,
+        }
+        with self.lock, open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def load_incidents(path: Path, start_ts: Optional[float] = None, end_ts: Optional[float] = None) -> list[dict]:
+    """Incidents overlapping [start_ts, end_ts], oldest first.
+
+    Each is {"rule", "description", "value", "start_ts", "end_ts"}; end_ts
+    is None while an incident is still open.
+    """
+    incidents = []
+    open_incidents = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            event = record.get("event")
+            if event == "start":
+                incident = {
+                    "rule": record["rule"],
+                    "description": record.get("description", ""),
+                    "value": record.get("value"),
+                    "start_ts": record["ts"],
+                    "end_ts": None,
+                }
+                open_incidents[record["rule"]] = incident
+                incidents.append(incident)
+            elif event == "end" and record.get("rule") in open_incidents:
+                open_incidents.pop(record["rule"])["end_ts"] = record["ts"]
+            elif event == "stop":
+                for incident in open_incidents.values():
+                    incident["end_ts"] = record["ts"]
+                open_incidents.clear()
+
+    return [
+        incident for incident in incidents
+        if (end_ts is None or incident["start_ts"] <= end_ts)
+        and (start_ts is None or incident["end_ts"] is None or incident["end_ts"] >= start_ts)
+    ]
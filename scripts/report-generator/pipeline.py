@@ -0,0 +1,186 @@
+"""
+Per-stage CDC pipeline analysis: backlog, lag and the limiting stage.
+
+The full profile's stages each expose a counter of the changes they have
+handled. The report charts their rates side by side; this module relates
+them. Each stage's rate is integrated into a cumulative count, and the
+backlog in front of a stage is the previous stage's count minus its own.
+A stage's lag behind the previous stage is the shift that best aligns
+their rate curves (cross-correlation). In each window, the stage whose
+backlog grew fastest beyond what its lag accounts for, relative to its
+input, limited the throughput; if no backlog grew, every stage kept up
+and the workload was the limit.
+
+Oracle counts redo entries rather than changes, so its count is rescaled
+to OLR's over the run. Its backlog therefore shows when OLR fell behind
+and caught up again, not an absolute number of changes.
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+# Stages in pipeline order: (stage, counter metric, unit)
+STAGES = [
+    ("Oracle", "oracledb_dml_redo_entries", "redo entries"),
+    ("OLR", "dml_ops", "changes"),
+    ("Debezium", "debezium_oracle_streaming_total_captured_dml", "changes"),
+    ("Kafka", "kafka_topic_partition_current_offset", "changes"),
+    ("Consumer", "kafka_consumergroup_current_offset", "changes"),
+]
+
+# A stage falls behind in a window when its backlog grows by more than
+# this fraction of what the previous stage handled in the window
+FALLING_BEHIND = 0.05
+# Windows where the first stage handled less than this fraction of its
+# busiest window are idle (rampup, drain)
+IDLE = 0.1
+WORKLOAD = "Workload"
+IDLE_STAGE = "Idle"
+
+
+@dataclass
+class StageAnalysis:
+    """One stage, compared with the previous stage."""
+    name: str
+    metric: str
+    unit: str
+    rate: np.ndarray  # per second, on the analysis grid
+    count: np.ndarray  # cumulative
+    scale: float = 1.0  # applied to rate and count to match the next stage's unit
+    backlog: Optional[np.ndarray] = None  # previous stage's count minus this one's
+    queued: Optional[np.ndarray] = None  # backlog beyond what is in transit for lag_seconds
+    lag_seconds: Optional[float] = None
+    correlation: Optional[float] = None
+
+
+@dataclass
+class PipelineAnalysis:
+    """Stages in order, and the limiting stage of each window."""
+    grid: np.ndarray  # timestamps
+    stages: list[StageAnalysis]
+    window_seconds: float
+    windows: list[tuple[float, float, str]] = field(default_factory=list)  # (start, end, limiting stage)
+
+
+def stage_index(metric_expr: str) -> Optional[int]:
+    """Index in STAGES of the stage a rate metric expression counts, if any."""
+    metric = metric_expr.split("{", 1)[0].strip()
+    for index, (_, stage_metric, _) in enumerate(STAGES):
+        if metric == stage_metric:
+            return index
+    return None
+
+
+def _on_grid(timestamps, values, grid: np.ndarray) -> Optional[np.ndarray]:
+    """Resample a rate series on the grid, interpolating over missing samples."""
+    ts = np.asarray(timestamps, dtype=float)
+    v = np.asarray(values, dtype=float)
+    finite = np.isfinite(v)
+    if finite.sum() < 2:
+        return None
+    return np.interp(grid, ts[finite], v[finite])
+
+
+def cumulative(rate: np.ndarray, step: float) -> np.ndarray:
+    """Trapezoidal running integral of a rate, starting at zero."""
+    return np.concatenate(([0.0], np.cumsum((rate[1:] + rate[:-1]) / 2 * step)))
+
+
+def estimate_lag(upstream: np.ndarray, downstream: np.ndarray, step: float,
+                 max_lag: float) -> tuple[Optional[float], Optional[float]]:
+    """Delay of downstream behind upstream, by cross-correlating the rates.
+
+    Returns (lag seconds, correlation at that lag); None if either rate is
+    flat, since a constant rate has no features to align.
+    """
+    n = upstream.size
+    max_shift = min(int(max_lag / step), n // 2)
+    best_shift, best_corr = None, None
+    for shift in range(max_shift + 1):
+        a = upstream[:n - shift]
+        b = downstream[shift:]
+        a = a - a.mean()
+        b = b - b.mean()
+        norm = np.sqrt(np.dot(a, a) * np.dot(b, b))
+        if norm == 0:
+            continue
+        corr = float(np.dot(a, b) / norm)
+        if best_corr is None or corr > best_corr:
+            best_shift, best_corr = shift, corr
+    if best_shift is None:
+        return None, None
+    return best_shift * step, best_corr
+
+
+def analyze_pipeline(rates: dict[int, tuple], start_ts: float, end_ts: float, step: float,
+                     window_seconds: float = 60, max_lag: float = 300) -> Optional[PipelineAnalysis]:
+    """Analyze the stages whose rate series are given.
+
+    rates maps a STAGES index to (timestamps, values). Returns None unless
+    at least two stages have data.
+    """
+    grid = np.arange(start_ts, end_ts + step / 2, step)
+    stages = []
+    for index in sorted(rates):
+        rate = _on_grid(*rates[index], grid)
+        if rate is None:
+            continue
+        name, metric, unit = STAGES[index]
+        stages.append(StageAnalysis(name=name, metric=metric, unit=unit, rate=rate, count=cumulative(rate, step)))
+    if len(stages) < 2 or grid.size < 3:
+        return None
+
+    # Rescale a stage counted in other units (Oracle's redo entries) to
+    # the next stage's run total, so backlogs subtract like for like
+    for prev, stage in zip(stages, stages[1:]):
+        if prev.unit != stage.unit and prev.count[-1] > 0:
+            prev.scale = stage.count[-1] / prev.count[-1]
+            prev.count = prev.count * prev.scale
+            prev.rate = prev.rate * prev.scale
+
+    for prev, stage in zip(stages, stages[1:]):
+        stage.backlog = prev.count - stage.count
+        stage.lag_seconds, stage.correlation = estimate_lag(prev.rate, stage.rate, step, max_lag)
+        # A stage that keeps up still trails its input by its lag; only the
+        # backlog beyond that is work waiting for it
+        shift = int(round((stage.lag_seconds or 0) / step))
+        arrived = np.concatenate((np.full(shift, prev.count[0]), prev.count[:prev.count.size - shift]))
+        stage.queued = arrived - stage.count
+
+    analysis = PipelineAnalysis(grid=grid, stages=stages, window_seconds=window_seconds)
+
+    # Limiting stage per window
+    window_steps = max(1, int(round(window_seconds / step)))
+    bounds = list(range(0, grid.size - 1, window_steps)) + [grid.size - 1]
+    first = stages[0].count
+    handled = np.diff(first[bounds])
+    busiest = handled.max() if handled.size else 0
+    for (a, b), input_count in zip(zip(bounds, bounds[1:]), handled):
+        if busiest <= 0 or input_count < IDLE * busiest:
+            limiting = IDLE_STAGE
+        else:
+            limiting, worst = WORKLOAD, FALLING_BEHIND
+            for prev, stage in zip(stages, stages[1:]):
+                arrived = prev.count[b] - prev.count[a]
+                if arrived <= 0:
+                    continue
+                growth = (stage.queued[b] - stage.queued[a]) / arrived
+                if growth > worst:
+                    limiting, worst = stage.name, growth
+        analysis.windows.append((float(grid[a]), float(grid[b]), limiting))
+    return analysis
+
+
+def limiting_shares(analysis: PipelineAnalysis, window: Optional[tuple[float, float]] = None) -> dict[str, float]:
+    """Share of the busy windows (inside window, if given) each stage limited, largest first."""
+    counts = {}
+    for start, end, stage in analysis.windows:
+        if stage == IDLE_STAGE:
+            continue
+        if window is not None and (start < window[0] or end > window[1]):
+            continue
+        counts[stage] = counts.get(stage, 0) + 1
+    total = sum(counts.values())
+    return {stage: counts[stage] / total for stage in sorted(counts, key=counts.get, reverse=True)}
@@ -0,0 +1,146 @@
+"""
+Direct HTTP access to Prometheus for the report generators.
+
+HttpQueryExecutor queries Prometheus over one pooled HTTP session.
+PortForward opens a single `kubectl port-forward` to the in-cluster
+Prometheus service and keeps it open for the whole report, so Kubernetes
+reports use the same HTTP path as Docker ones.
+"""
+
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+
+
+class PortForward:
+    """A kubectl port-forward to a Prometheus service, for the life of a report."""
+
+    def __init__(self, namespace: str, service: str, remote_port: int = 9090):
+        self.namespace = namespace
+        self.service = service
+        self.remote_port = remote_port
+        self.local_port = None
+        self.process = None
+        self.stderr = None
+
+    @classmethod
+    def for_url(cls, namespace: str, prometheus_url: str) -> "PortForward":
+        """Build a port-forward from the in-cluster URL, e.g. http://svc:9090."""
+        url = urlparse(prometheus_url)
+        return cls(namespace, url.hostname, url.port or 9090)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.local_port}"
+
+    def start(self, timeout: float = 30) -> str:
+        """Start kubectl port-forward and wait until it accepts connections."""
+        # Let the kernel pick a free local port
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.local_port = s.getsockname()[1]
+
+        # kubectl logs a line per forwarded connection; keep that out of a pipe
+        # nobody reads, and capture stderr only for error reporting
+        self.stderr = tempfile.TemporaryFile(mode="w+")
+        cmd = [
+            "kubectl", "port-forward", "-n", self.namespace, "--address", "127.0.0.1",
+            f"svc/{self.service}", f"{self.local_port}:{self.remote_port}",
+        ]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=self.stderr, text=True)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.process.poll() is not None:
+                error = self._read_stderr()
+                self.stop()
+                raise RuntimeError(f"kubectl port-forward exited: {error or 'no output'}")
+            try:
+                with socket.create_connection(("127.0.0.1", self.local_port), timeout=0.5):
+                    break
+            except OSError:
+                pass
+            if time.monotonic() >= deadline:
+                self.stop()
+                raise RuntimeError(f"kubectl port-forward to svc/{self.service} not ready after {timeout:.0f}s")
+            time.sleep(0.2)
+
+        print(f"Port-forwarding svc/{self.service}:{self.remote_port} to {self.url}", file=sys.stderr)
+        return self.url
+
+    def _read_stderr(self) -> str:
+        self.stderr.seek(0)
+        return self.stderr.read().strip()
+
+    def stop(self):
+        """Terminate kubectl port-forward."""
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+        if self.stderr is not None:
+            self.stderr.close()
+            self.stderr = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class HttpQueryExecutor:
+    """Executes queries directly against Prometheus over a pooled HTTP session."""
+
+    def __init__(self, base_url: str, pool_size: int = 8, port_forward: Optional[PortForward] = None):
+        self.base_url = base_url.rstrip("/")
+        self.port_forward = port_forward
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def via_port_forward(cls, namespace: str, prometheus_url: str, pool_size: int = 8) -> "HttpQueryExecutor":
+        """Open a port-forward to the in-cluster Prometheus and query through it."""
+        port_forward = PortForward.for_url(namespace, prometheus_url)
+        return cls(port_forward.start(), pool_size, port_forward)
+
+    def is_ready(self) -> bool:
+        """Check whether Prometheus answers on the configured URL."""
+        try:
+            return self.session.get(f"{self.base_url}/-/ready", timeout=2).ok
+        except requests.RequestException:
+            return False
+
+    def query_prometheus(self, endpoint: str, params: dict) -> dict:
+        """Query Prometheus and return JSON response."""
+        try:
+            response = self.session.get(f"{self.base_url}{endpoint}", params=params, timeout=60)
+        except requests.RequestException as e:
+            print(f"Request error: {e}", file=sys.stderr)
+            return {}
+
+        # Prometheus reports query errors as JSON with a 4xx/5xx status
+        try:
+            return response.json()
+        except ValueError as e:
+            print(f"JSON decode error: {e} (HTTP {response.status_code})", file=sys.stderr)
+            print(f"Raw output: {response.text[:500]}", file=sys.stderr)
+            return {}
+
+    def close(self):
+        self.session.close()
+        if self.port_forward is not None:
+            self.port_forward.stop()
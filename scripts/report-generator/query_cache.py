@@ -0,0 +1,200 @@
+"""
+On-disk cache for Prometheus range queries.
+
+Each entry holds the samples of one query at one step, on one time grid,
+together with the intervals already fetched. A request that is partly
+covered only fetches the missing sub-ranges, so re-rendering a report is
+instant and a report can be rebuilt after the stack is gone. Entries are
+content-addressed (SHA-256 of the source, Prometheus URL, query, step
+and grid phase) and evicted least-recently-used once the cache exceeds
+its size cap.
+
+Samples within SETTLE_SECONDS of their fetch time are kept as a pending
+interval stamped with that time. They are re-fetched while Prometheus is
+reachable and served from the cache when it is not.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "oracle-cdc-test" / "query-cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Samples this close to their fetch time may still change (scrape and
+# ingestion lag), so they are cached as pending rather than covered
+SETTLE_SECONDS = 300
+
+
+class QueryCache:
+    """Content-addressed, size-capped cache of range query results."""
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, source: str = "",
+                 base_url: str = ""):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        # Identify the Prometheus instance, e.g. "docker" or "k8s/oracle-cdc",
+        # and its URL, so two instances in one namespace don't share entries
+        self.source = source
+        self.base_url = base_url.rstrip("/")
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        # Queries run on a thread pool; the counters have their own lock
+        self.stats_lock = threading.Lock()
+        self.hits = 0
+        self.fetches = 0
+
+    def _key(self, query: str, step: float, phase: float) -> str:
+        identity = json.dumps([self.source, self.base_url, query, step, phase])
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def _load(self, path: Path) -> dict:
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)  # LRU: mtime is the last access
+            return entry
+        except (OSError, ValueError):
+            return {"intervals": [], "pending": [], "series": {}}
+
+    def _store(self, path: Path, entry: dict):
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits its cap."""
+        with self.lock:
+            entries = []
+            for path in self.dir.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+                total -= size
+
+    @staticmethod
+    def _missing(intervals: list, start: float, end: float, step: float) -> list:
+        """Sub-ranges of [start, end] (grid points) not covered by intervals."""
+        gaps = []
+        cursor = start
+        for lo, hi in intervals:
+            if hi < cursor:
+                continue
+            if lo > end:
+                break
+            if lo > cursor:
+                gaps.append((cursor, min(end, lo - step)))
+            cursor = max(cursor, hi + step)
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+    @staticmethod
+    def _merge(intervals: list, new: tuple, step: float) -> list:
+        merged = []
+        for lo, hi in sorted(intervals + [list(new)]):
+            if merged and lo <= merged[-1][1] + step:
+                merged[-1][1] = max(merged[-1][1], hi)
+            else:
+                merged.append([lo, hi])
+        return merged
+
+    def query_range(self, executor, query: str, start: float, end: float, step: float) -> dict:
+        """Answer a range query from the cache, fetching only what is missing.
+
+        Returns the Prometheus API response shape, so callers parse it the
+        same way as an uncached response.
+        """
+        # Prometheus evaluates at start + k*step; snap end onto that grid
+        end = start + ((end - start) // step) * step
+        phase = start % step
+        key = self._key(query, step, phase)
+        path = self.dir / f"{key}.json"
+
+        with self._key_lock(key):
+            entry = self._load(path)
+            entry.setdefault("pending", [])
+            changed = False
+
+            # A pending interval is settled once it ended SETTLE_SECONDS
+            # before it was fetched
+            for lo, hi, fetched_at in entry["pending"]:
+                if fetched_at - SETTLE_SECONDS >= hi:
+                    entry["intervals"] = self._merge(entry["intervals"], (lo, hi), step)
+                    changed = True
+            entry["pending"] = [p for p in entry["pending"] if p[2] - SETTLE_SECONDS < p[1]]
+
+            for gap_start, gap_end in self._missing(entry["intervals"], start, end, step):
+                with self.stats_lock:
+                    self.fetches += 1
+                data = executor.query_prometheus("/api/v1/query_range", {
+                    "query": query,
+                    "start": gap_start,
+                    "end": gap_end,
+                    "step": step,
+                })
+                if data.get("status") != "success":
+                    if not entry["series"]:
+                        return data
+                    # Prometheus is gone (e.g. after make clean): serve what we have
+                    print(f"Query cache: fetch failed for {query!r} "
+                          f"({data.get('error', 'no response')}), using cached samples", file=sys.stderr)
+                    break
+                fetched_at = time.time()
+                for result in data.get("data", {}).get("result", []):
+                    labels = json.dumps(result.get("metric", {}), sort_keys=True)
+                    samples = entry["series"].setdefault(labels, {})
+                    for ts, value in result.get("values", []):
+                        samples[repr(float(ts))] = value
+                # Mark the part that can no longer change as covered and the
+                # rest as pending, stamped with its fetch time
+                covered_end = min(gap_end, start + ((fetched_at - SETTLE_SECONDS - start) // step) * step)
+                if covered_end >= gap_start:
+                    entry["intervals"] = self._merge(entry["intervals"], (gap_start, covered_end), step)
+                pending = []
+                for lo, hi, stamp in entry["pending"]:
+                    if lo < gap_start:
+                        pending.append([lo, min(hi, gap_start - step), stamp])
+                    if hi > gap_end:
+                        pending.append([max(lo, gap_end + step), hi, stamp])
+                entry["pending"] = pending
+                if covered_end < gap_end:
+                    entry["pending"].append([max(gap_start, covered_end + step), gap_end, fetched_at])
+                changed = True
+
+            if changed:
+                entry.update({"source": self.source, "base_url": self.base_url, "query": query, "step": step})
+                try:
+                    self._store(path, entry)
+                except OSError as e:
+                    print(f"Query cache write failed: {e}", file=sys.stderr)
+            else:
+                with self.stats_lock:
+                    self.hits += 1
+
+        result = []
+        for labels, samples in entry["series"].items():
+            values = sorted((float(ts), value) for ts, value in samples.items() if start <= float(ts) <= end)
+            if values:
+                result.append({"metric": json.loads(labels), "values": [[ts, value] for ts, value in values]})
+        return {"status": "success", "data": {"resultType": "matrix", "result": result}}
@@ -0,0 +1,800 @@
+"""
+Shared core of the report generators (generate_report.py, k8s_report.py).
+
+The PromQL client and its query backends, number formatting, the report
+generator (rate/total/gauge charts, metrics table, steady state, CDC pipeline
+analysis, incidents), rendering, the run data and archive, the shared
+command-line options and the `render` entry point live here. The scripts
+only add their container/pod metric families, query backend and options.
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+from jinja2 import Environment, FileSystemLoader
+
+from archive import ArchiveExecutor, config_from_dict, load_archive, save_archive
+from downsample import encode_series
+from incidents import load_incidents
+from pipeline import analyze_pipeline, limiting_shares, stage_index
+from prometheus_http import HttpQueryExecutor
+from query_cache import DEFAULT_CACHE_DIR, QueryCache
+from stats import chart_values, detect_steady_state, in_window, summarize
+
+TEMPLATE_DIR = Path(__file__).parent
+RUN_FORMAT_VERSION = 1
+
+
+@dataclass
+class MetricSeries:
+    """A time series of metric values."""
+    name: str
+    labels: dict
+    timestamps: list[float]
+    values: list[float]
+
+
+@dataclass
+class BaseReportConfig:
+    """Configuration shared by both report generators."""
+    start_time: datetime
+    end_time: datetime
+    step: int = 30  # seconds
+    prometheus_url: str = "http://prometheus:9090"
+    containers: list[str] = field(default_factory=list)
+    rate_of_metrics: list[str] = field(default_factory=list)  # e.g., ['dml_ops{filter="out"}']
+    total_of_metrics: list[str] = field(default_factory=list)  # e.g., ['bytes_sent']
+    gauge_of_metrics: list[str] = field(default_factory=list)  # e.g., ['kafka_consumer_lag']
+    title: str = "Performance Test Report"
+    # Query backend: "http" talks to Prometheus directly (through kubectl
+    # port-forward on Kubernetes), "exec" runs curl inside a container,
+    # "auto" uses http when Prometheus is reachable
+    backend: str = "auto"
+    query_workers: int = 8  # Concurrent queries
+    # On-disk range query cache; None disables it
+    cache_dir: Optional[str] = str(DEFAULT_CACHE_DIR)
+    cache_max_mb: int = 512
+    # Steady-state window for the metrics table: detected from the rate of
+    # steady_metric unless steady_start/steady_end are given
+    steady_state: bool = True
+    steady_metric: str = "oracledb_activity_user_commits"
+    steady_start: Optional[datetime] = None
+    steady_end: Optional[datetime] = None
+    # Chart payload: points per series after LTTB downsampling (0 keeps
+    # every sample), and an optional full-resolution sidecar
+    max_points: int = 1000
+    full_resolution: bool = False
+    # CDC pipeline analysis: the limiting stage is named per window of this length
+    pipeline_window: int = 60
+    # Watchdog incident file (watchdog.py); incidents mark the run invalid
+    incidents: Optional[str] = None
+    # The watchdog exited before the benchmark ended, so stalls may be missing
+    unwatched: bool = False
+
+
+def promql_regex_escape(value: str) -> str:
+    """Escape regex metacharacters for a PromQL =~ matcher (RE2 syntax)."""
+    return re.sub(r'([.^$*+?()\[\]{}|\\])', r'\\\1', value)
+
+
+def sum_series(series_list: list[MetricSeries]) -> MetricSeries:
+    """Add series point-wise on their (step-aligned) timestamps."""
+    if len(series_list) == 1:
+        return series_list[0]
+    totals = {}
+    for series in series_list:
+        for ts, value in zip(series.timestamps, series.values):
+            totals[ts] = totals.get(ts, 0.0) + value
+    timestamps = sorted(totals)
+    return MetricSeries(
+        name=series_list[0].name,
+        labels={},
+        timestamps=timestamps,
+        values=[totals[ts] for ts in timestamps],
+    )
+
+
+def format_number(value: float, unit: str = "") -> str:
+    """Format a number with appropriate precision and unit."""
+    if value >= 1_000_000:
+        return f"{value/1_000_000:,.1f}M{unit}"
+    elif value >= 1_000:
+        return f"{value/1_000:,.1f}K{unit}"
+    elif value >= 100:
+        return f"{value:,.0f}{unit}"
+    elif value >= 1:
+        return f"{value:,.1f}{unit}"
+    else:
+        return f"{value:,.2f}{unit}"
+
+
+def parse_time(value: str) -> datetime:
+    """Parse an ISO timestamp, accepting a trailing Z."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def docker_exec_command(service: str) -> list[str]:
+    """Command prefix running a command in a Docker Compose service."""
+    return ["docker", "compose", "exec", "-T", service]
+
+
+def kubectl_exec_command(namespace: str, deployment: str) -> list[str]:
+    """Command prefix running a command in a Kubernetes deployment."""
+    return ["kubectl", "exec", "-n", namespace, f"deployment/{deployment}", "--"]
+
+
+class ExecQueryExecutor:
+    """Executes queries with curl via docker compose exec or kubectl exec."""
+
+    def __init__(self, exec_command: list[str], prometheus_url: str):
+        self.exec_command = exec_command
+        self.prometheus_url = prometheus_url
+
+    def _run_command(self, cmd: list[str]) -> str:
+        """Run a command and return stdout."""
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            if result.returncode != 0:
+                print(f"Command failed: {' '.join(cmd)}", file=sys.stderr)
+                print(f"stderr: {result.stderr}", file=sys.stderr)
+                return ""
+            return result.stdout
+        except subprocess.TimeoutExpired:
+            print(f"Command timed out: {' '.join(cmd)}", file=sys.stderr)
+            return ""
+        except Exception as e:
+            print(f"Command error: {e}", file=sys.stderr)
+            return ""
+
+    def query_prometheus(self, endpoint: str, params: dict) -> dict:
+        """Query Prometheus and return JSON response."""
+        query_parts = []
+        for k, v in params.items():
+            query_parts.append(f"{k}={quote(str(v), safe='')}")
+        query_string = "&".join(query_parts)
+        url = f"{self.prometheus_url}{endpoint}?{query_string}"
+
+        curl_cmd = f"curl -s '{url}'"
+        output = self._run_command(self.exec_command + ["sh", "-c", curl_cmd])
+        if not output:
+            return {}
+
+        try:
+            return json.loads(output)
+        except json.JSONDecodeError as e:
+            print(f"JSON decode error: {e}", file=sys.stderr)
+            print(f"Raw output: {output[:500]}", file=sys.stderr)
+            return {}
+
+    def close(self):
+        pass
+
+
+def create_executor(backend: str, exec_command: list[str], prometheus_url: str, query_workers: int = 8,
+                    http_url: Optional[str] = None, namespace: Optional[str] = None):
+    """Pick the query backend; curl via exec_command is the fallback.
+
+    The http backend queries http_url directly or, given a namespace, the
+    in-cluster prometheus_url through one kubectl port-forward.
+    """
+    if backend in ("http", "auto"):
+        try:
+            if namespace is not None:
+                # One port-forward to the in-cluster Prometheus for the whole report
+                executor = HttpQueryExecutor.via_port_forward(namespace, prometheus_url, query_workers)
+            else:
+                executor = HttpQueryExecutor(http_url, query_workers)
+        except (OSError, RuntimeError) as e:
+            if backend == "http":
+                raise
+            print(f"{e}, falling back to exec", file=sys.stderr)
+        else:
+            if backend == "http" or executor.is_ready():
+                return executor
+            print(f"Prometheus not reachable at {executor.base_url}, falling back to exec", file=sys.stderr)
+            executor.close()
+    return ExecQueryExecutor(exec_command, prometheus_url)
+
+
+class PrometheusClient:
+    """Client for querying Prometheus."""
+
+    def __init__(self, executor, cache: Optional[QueryCache] = None):
+        self.executor = executor
+        self.cache = cache
+        # Every range query response, by query, for the run archive
+        self.responses = {}
+
+    def query_range(self, query: str, start: float, end: float, step: int) -> list[MetricSeries]:
+        """Execute a range query and return metric series."""
+        params = {
+            "query": query,
+            "start": start,
+            "end": end,
+            "step": step,
+        }
+
+        if self.cache is not None:
+            data = self.cache.query_range(self.executor, query, start, end, step)
+        else:
+            data = self.executor.query_prometheus("/api/v1/query_range", params)
+        self.responses[query] = data
+
+        if data.get("status") != "success":
+            return []
+
+        series_list = []
+        for result in data.get("data", {}).get("result", []):
+            metric = result.get("metric", {})
+            values = result.get("values", [])
+
+            timestamps = [v[0] for v in values]
+            # NaN stays NaN: it is a missing sample, not a zero
+            metric_values = [float(v[1]) for v in values]
+
+            series = MetricSeries(
+                name=metric.get("__name__", "unknown"),
+                labels={k: v for k, v in metric.items() if k != "__name__"},
+                timestamps=timestamps,
+                values=metric_values,
+            )
+            series_list.append(series)
+
+        return series_list
+
+    def query_instant(self, query: str) -> list[dict]:
+        """Execute an instant query."""
+        params = {"query": query}
+        data = self.executor.query_prometheus("/api/v1/query", params)
+
+        if data.get("status") != "success":
+            return []
+
+        return data.get("data", {}).get("result", [])
+
+
+class BaseReportGenerator:
+    """Generates performance reports from Prometheus metrics.
+
+    Subclasses provide the query backend and the container metric
+    families (container_queries); everything else is shared.
+    """
+
+    name = ""  # generator script, recorded in the run archive
+
+    def __init__(self, config: BaseReportConfig, executor=None):
+        self.config = config
+        if executor is None:
+            executor = self.create_executor()
+        cache = None
+        if config.cache_dir:
+            cache = QueryCache(Path(config.cache_dir), config.cache_max_mb * 1024 * 1024,
+                               source=self.cache_source(), base_url=self.cache_base_url())
+        self.client = PrometheusClient(executor, cache)
+        self.start_ts = config.start_time.timestamp()
+        self.end_ts = config.end_time.timestamp()
+        self.series = {}
+        self.incidents = []
+        if config.incidents:
+            try:
+                self.incidents = load_incidents(Path(config.incidents), self.start_ts, self.end_ts)
+            except FileNotFoundError:
+                print(f"No incident file at {config.incidents}", file=sys.stderr)
+
+    def create_executor(self):
+        """The query backend for this configuration."""
+        raise NotImplementedError
+
+    def cache_source(self) -> str:
+        """Identifies the Prometheus instance in the query cache."""
+        raise NotImplementedError
+
+    def cache_base_url(self) -> str:
+        """The Prometheus URL, part of every query cache key."""
+        return self.config.prometheus_url
+
+    def container_queries(self) -> tuple[list[str], list[tuple]]:
+        """Containers to chart, and the container metric families as
+        (data key, query method, rounding); each query method takes the
+        container list and returns a series per container."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the query backend (HTTP session, port-forward)."""
+        self.client.executor.close()
+        cache = self.client.cache
+        if cache is not None:
+            print(f"Query cache: {cache.hits} queries served from cache, {cache.fetches} ranges fetched", file=sys.stderr)
+
+    def get_metric_rate(self, metric_expr: str) -> Optional[MetricSeries]:
+        """Get rate of a metric expression (e.g., 'dml_ops{filter="out"}')."""
+        query = f'sum(rate({metric_expr}[30s]))'
+        series_list = self.client.query_range(query, self.start_ts, self.end_ts, self.config.step)
+
+        if series_list:
+            series = series_list[0]
+            series.name = metric_expr
+            return series
+        return None
+
+    def get_metric_total(self, metric_expr: str) -> Optional[MetricSeries]:
+        """Get total (raw sum) of a metric expression (e.g., 'bytes_sent')."""
+        query = f'sum({metric_expr})'
+        series_list = self.client.query_range(query, self.start_ts, self.end_ts, self.config.step)
+
+        if series_list:
+            series = series_list[0]
+            series.name = metric_expr
+            return series
+        return None
+
+    def _table_row(self, name: str, series: MetricSeries, unit: str, total: Optional[str],
+                   total_unit: str, window: Optional[tuple[float, float]] = None) -> Optional[dict]:
+        """Summarize one series as a metrics table row.
+
+        Statistics cover the steady-state window if one is given; totals
+        always cover the whole run.
+        """
+        stats = summarize(*in_window(series.timestamps, series.values, window), self.config.step)
+        if stats is None:
+            return None
+        run_stats = stats if window is None else summarize(series.timestamps, series.values, self.config.step)
+        if total == "integral":
+            total_text = format_number(run_stats.integral, total_unit)
+        elif total == "delta":
+            total_text = f"+{format_number(run_stats.delta, total_unit)}"
+        else:
+            total_text = "-"
+        return {
+            "name": name,
+            "min": format_number(stats.min, unit),
+            "avg": format_number(stats.mean, unit),
+            "p50": format_number(stats.p50, unit),
+            "p95": format_number(stats.p95, unit),
+            "p99": format_number(stats.p99, unit),
+            "max": format_number(stats.max, unit),
+            "total": total_text,
+        }
+
+    def _encode_series(self, series: MetricSeries, digits: int, max_points: Optional[int] = -1) -> dict:
+        """Encode a series for a chart, downsampled to the configured point count."""
+        if max_points == -1:
+            max_points = self.config.max_points
+        return encode_series(series.timestamps, series.values, self.start_ts, self.config.step, digits, max_points)
+
+    def _incidents(self) -> list[dict]:
+        """Watchdog incidents during the run, clipped to it."""
+        incidents = []
+        for incident in self.incidents:
+            start = max(incident["start_ts"], self.start_ts)
+            end = min(incident["end_ts"] if incident["end_ts"] is not None else self.end_ts, self.end_ts)
+            incidents.append({
+                "rule": incident["rule"],
+                "description": incident["description"],
+                "start": datetime.fromtimestamp(start, tz=timezone.utc).strftime("%H:%M:%S"),
+                "end": datetime.fromtimestamp(end, tz=timezone.utc).strftime("%H:%M:%S"),
+                "ongoing": incident["end_ts"] is None,
+                "seconds": round(end - start),
+                # Chart x-axis positions (seconds since start)
+                "start_offset": start - self.start_ts,
+                "end_offset": end - self.start_ts,
+            })
+        return incidents
+
+    def _steady_state(self, throughput: Optional[MetricSeries]) -> Optional[dict]:
+        """Resolve the steady-state window, manual or detected from throughput."""
+        if not self.config.steady_state:
+            return None
+        if self.config.steady_start and self.config.steady_end:
+            window = (self.config.steady_start.timestamp(), self.config.steady_end.timestamp())
+            source = "manual"
+        elif throughput is not None:
+            window = detect_steady_state(throughput.timestamps, throughput.values, self.config.step)
+            source = "detected"
+            if window is None:
+                print(f"No steady state detected in {self.config.steady_metric}, using the whole run", file=sys.stderr)
+                return None
+        else:
+            return None
+
+        steady = {
+            "source": source,
+            "window": list(window),
+            "start": datetime.fromtimestamp(window[0], tz=timezone.utc).strftime("%H:%M:%S"),
+            "end": datetime.fromtimestamp(window[1], tz=timezone.utc).strftime("%H:%M:%S"),
+            "minutes": round((window[1] - window[0]) / 60, 1),
+            # Chart x-axis positions (seconds since start)
+            "start_offset": window[0] - self.start_ts,
+            "end_offset": window[1] - self.start_ts,
+            "throughput": None,
+        }
+        if throughput is not None:
+            stats = summarize(*in_window(throughput.timestamps, throughput.values, window), self.config.step)
+            if stats is not None:
+                steady["throughput"] = format_number(stats.mean, "/s")
+        return steady
+
+    def _pipeline(self, rate_series: list[MetricSeries], window: Optional[tuple[float, float]]) -> Optional[dict]:
+        """Relate the CDC stages' rates: backlog, lag and the limiting stage.
+
+        Needs the rates of at least two stages among the rate metrics.
+        """
+        rates = {}
+        for series in rate_series:
+            index = stage_index(series.name)
+            if index is not None and index not in rates:
+                rates[index] = (series.timestamps, series.values)
+        analysis = analyze_pipeline(rates, self.start_ts, self.end_ts, self.config.step, self.config.pipeline_window)
+        if analysis is None:
+            return None
+
+        shares = limiting_shares(analysis, window)
+        stages = []
+        for stage in analysis.stages:
+            # Rates and totals in the stage's own unit
+            stats = summarize(*in_window(analysis.grid, stage.rate / stage.scale, window), self.config.step)
+            row = {
+                "name": stage.name,
+                "metric": stage.metric,
+                "rate": format_number(stats.mean, "/s") if stats else "-",
+                "total": format_number(stage.count[-1] / stage.scale),
+                "backlog_max": "-",
+                "backlog_end": "-",
+                "lag": "-",
+                "limited": f"{shares[stage.name] * 100:.0f}%" if stage.name in shares else "-",
+            }
+            if stage.backlog is not None:
+                row["backlog_max"] = format_number(max(float(stage.backlog.max()), 0))
+                row["backlog_end"] = format_number(max(float(stage.backlog[-1]), 0))
+            if stage.lag_seconds is not None:
+                row["lag"] = f"{stage.lag_seconds:.0f} s (r={stage.correlation:.2f})"
+            stages.append(row)
+
+        # Consecutive windows with the same limiting stage, merged
+        timeline = []
+        for start, end, limiting in analysis.windows:
+            if timeline and timeline[-1]["stage"] == limiting:
+                timeline[-1]["end_ts"] = end
+            else:
+                timeline.append({"start_ts": start, "end_ts": end, "stage": limiting})
+        for span in timeline:
+            span["start"] = datetime.fromtimestamp(span.pop("start_ts"), tz=timezone.utc).strftime("%H:%M:%S")
+            span["end"] = datetime.fromtimestamp(span.pop("end_ts"), tz=timezone.utc).strftime("%H:%M:%S")
+
+        bottleneck = next(iter(shares), None)
+        return {
+            "bottleneck": bottleneck,
+            "bottleneck_share": f"{shares[bottleneck] * 100:.0f}%" if bottleneck else None,
+            "scope": "steady-state" if window else "busy",
+            "window_seconds": analysis.window_seconds,
+            "stages": stages,
+            "timeline": timeline,
+            "backlog_series": [{
+                "name": f"In front of {stage.name}",
+                "data": encode_series(analysis.grid, stage.backlog, self.start_ts, self.config.step, 0,
+                                      self.config.max_points),
+            } for stage in analysis.stages if stage.backlog is not None],
+        }
+
+    def generate(self) -> dict:
+        """Generate all report data."""
+        data = {
+            "title": self.config.title,
+            "start_time": self.config.start_time.strftime("%Y-%m-%d %H:%M:%S UTC"),
+            "end_time": self.config.end_time.strftime("%Y-%m-%d %H:%M:%S UTC"),
+            "duration_minutes": int((self.end_ts - self.start_ts) / 60),
+            "start_ts": self.start_ts,
+            "step": self.config.step,
+            "cpu_series": [],
+            "memory_series": [],
+            "network_rx_series": [],
+            "network_tx_series": [],
+            "fs_read_series": [],
+            "fs_write_series": [],
+            "rate_series": [],
+            "total_series": [],
+            "gauge_series": [],
+            "metrics_table": [],
+            "steady_state": None,
+            "steady_metric": self.config.steady_metric,
+            "pipeline": None,
+            "incidents": self._incidents(),
+            "unwatched": self.config.unwatched,
+        }
+
+        container_names, container_queries = self.container_queries()
+
+        # Full-precision series behind each chart, for the metrics table
+        # and the run artifact
+        self.series = raw = {key: [] for key, _, _ in container_queries}
+        raw["rate_series"] = []
+        raw["total_series"] = []
+        raw["gauge_series"] = []
+
+        # Decimal digits kept per chart. Gauges carry latency quantiles in
+        # seconds, so they keep millisecond precision.
+        chart_digits = {key: digits for key, _, digits in container_queries}
+        chart_digits.update(rate_series=1, total_series=1, gauge_series=3)
+
+        # Issue every query up front on the thread pool, then collect the
+        # results in report order. Each container family is one query
+        # covering all containers.
+        with ThreadPoolExecutor(max_workers=max(self.config.query_workers, 1)) as pool:
+            container_futures = [(key, digits, pool.submit(query_method, container_names))
+                                 for key, query_method, digits in container_queries]
+
+            rate_futures = [(metric_expr, pool.submit(self.get_metric_rate, metric_expr))
+                            for metric_expr in self.config.rate_of_metrics]
+            total_futures = [(metric_expr, pool.submit(self.get_metric_total, metric_expr))
+                             for metric_expr in self.config.total_of_metrics]
+            gauge_futures = [(metric_expr, pool.submit(self.get_metric_total, metric_expr))
+                             for metric_expr in self.config.gauge_of_metrics]
+            steady_future = None
+            if self.config.steady_state:
+                steady_future = pool.submit(self.get_metric_rate, self.config.steady_metric)
+
+            # Get container metrics
+            for key, digits, future in container_futures:
+                by_container = future.result()
+                for container_name in container_names:
+                    series = by_container.get(container_name)
+                    if series:
+                        data[key].append({
+                            "name": series.name,
+                            "data": self._encode_series(series, digits),
+                        })
+                        raw[key].append(series)
+
+            # Get rate metrics (rate charts)
+            for metric_expr, future in rate_futures:
+                rate_series = future.result()
+                if rate_series:
+                    data["rate_series"].append({
+                        "name": metric_expr,
+                        "data": self._encode_series(rate_series, chart_digits["rate_series"]),
+                    })
+                    raw["rate_series"].append(rate_series)
+
+            # Get total metrics (raw value charts)
+            for metric_expr, future in total_futures:
+                total_series = future.result()
+                if total_series:
+                    data["total_series"].append({
+                        "name": metric_expr,
+                        "data": self._encode_series(total_series, chart_digits["total_series"]),
+                    })
+                    raw["total_series"].append(total_series)
+
+            # Get gauge metrics (raw value charts without a run total)
+            for metric_expr, future in gauge_futures:
+                gauge_series = future.result()
+                if gauge_series:
+                    data["gauge_series"].append({
+                        "name": metric_expr,
+                        "data": self._encode_series(gauge_series, chart_digits["gauge_series"]),
+                    })
+                    raw["gauge_series"].append(gauge_series)
+
+            data["steady_state"] = self._steady_state(steady_future.result() if steady_future else None)
+
+        # Build metrics table from the full-precision series, over the
+        # steady-state window when there is one
+        window = tuple(data["steady_state"]["window"]) if data["steady_state"] else None
+        table_rows = [
+            # (data key, name suffix, unit, total column: None, "integral" or "delta", total unit)
+            ("cpu_series", " CPU", "%", None, ""),
+            ("memory_series", " Memory", " MB", None, ""),
+            ("network_rx_series", " Net RX", " B/s", "integral", " B"),
+            ("network_tx_series", " Net TX", " B/s", "integral", " B"),
+            ("rate_series", "", "/s", "integral", ""),
+            ("total_series", "", "", "delta", ""),
+            ("gauge_series", "", "", None, ""),
+        ]
+        for key, suffix, unit, total, total_unit in table_rows:
+            for series in raw.get(key, []):
+                row = self._table_row(f"{series.name}{suffix}", series, unit, total, total_unit, window)
+                if row:
+                    data["metrics_table"].append(row)
+
+        data["pipeline"] = self._pipeline(raw["rate_series"], window)
+
+        # Full-resolution chart data, written to a sidecar by render_report
+        if self.config.full_resolution:
+            data["full_series"] = {
+                key: [self._encode_series(series, chart_digits[key], max_points=None) for series in series_list]
+                for key, series_list in raw.items()
+            }
+
+        return data
+
+
+def render_report(data: dict, template_dir: Path, output_path: Path):
+    """Render the report using Jinja2 template."""
+    env = Environment(loader=FileSystemLoader(template_dir))
+    template = env.get_template("charts.html.j2")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Full-resolution data goes to a script next to the report, which the
+    # page loads on demand (a script tag works from file://, fetch() does not)
+    full_series = data.pop("full_series", None)
+    data["full_resolution_src"] = None
+    if full_series is not None:
+        sidecar = output_path.with_suffix(".full.js")
+        sidecar.write_text(f"window.fullResolutionSeries = {json.dumps(full_series, separators=(',', ':'))};\n")
+        data["full_resolution_src"] = sidecar.name
+
+    html = template.render(**data)
+
+    output_path.write_text(html)
+    print(f"Report generated: {output_path}")
+
+
+def save_run(path: Path, config, data: dict, series: dict):
+    """Write a run's full-precision series and summary as JSON (see compare.py)."""
+    run = {
+        "version": RUN_FORMAT_VERSION,
+        "title": data["title"],
+        "start_time": config.start_time.isoformat(),
+        "end_time": config.end_time.isoformat(),
+        "step": config.step,
+        "containers": config.containers,
+        "rate_of_metrics": config.rate_of_metrics,
+        "total_of_metrics": config.total_of_metrics,
+        "gauge_of_metrics": config.gauge_of_metrics,
+        "steady_state": data["steady_state"],
+        "incidents": data["incidents"],
+        "unwatched": data["unwatched"],
+        "metrics_table": data["metrics_table"],
+        "series": {
+            key: [{
+                "name": s.name,
+                "labels": s.labels,
+                "timestamps": [float(ts) for ts in s.timestamps],
+                "values": chart_values(s.values, 6),
+            } for s in series_list]
+            for key, series_list in series.items()
+        },
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(run, separators=(",", ":")))
+    print(f"Run data saved: {path}")
+
+
+def write_report(generator: BaseReportGenerator, output_path: Path, run_log: Optional[Path] = None):
+    """Generate a report, then write its HTML, run data and run archive."""
+    try:
+        data = generator.generate()
+    finally:
+        generator.close()
+
+    render_report(data, TEMPLATE_DIR, output_path)
+    save_run(output_path.with_suffix(".json"), generator.config, data, generator.series)
+    save_archive(output_path.with_suffix(".npz"), generator.name, generator.config, generator.client.responses,
+                 run_log, generator.incidents)
+
+
+def add_view_arguments(parser: argparse.ArgumentParser):
+    """Options that only change how the data is presented; render takes them too."""
+    parser.add_argument("--max-points", type=int, default=1000,
+                        help="Points per chart series after LTTB downsampling (0 keeps every sample)")
+    parser.add_argument("--full-resolution", action="store_true",
+                        help="Also write every sample to a sidecar file the report can load on demand")
+    parser.add_argument("--pipeline-window", type=int, default=60,
+                        help="Window length (seconds) of the CDC pipeline's per-window limiting stage")
+    parser.add_argument("--steady-start", help="Steady-state window start (ISO format); overrides detection")
+    parser.add_argument("--steady-end", help="Steady-state window end (ISO format); overrides detection")
+    parser.add_argument("--no-steady-state", action="store_true",
+                        help="Compute the metrics table over the whole run instead of the steady-state window")
+
+
+def add_report_arguments(parser: argparse.ArgumentParser):
+    """Options shared by both report generators."""
+    parser.add_argument("--start", required=True, help="Start time (ISO format, e.g., 2025-12-20T20:12:00Z)")
+    parser.add_argument("--end", required=True, help="End time (ISO format)")
+    parser.add_argument("--containers", required=True, help="Comma-separated list of container names (e.g., oracle,olr)")
+    parser.add_argument("--rate-of", action="append", dest="rate_of_metrics", default=[],
+                        help="Metric expression for rate chart (can be specified multiple times, e.g., --rate-of='dml_ops{filter=\"out\"}')")
+    parser.add_argument("--total-of", action="append", dest="total_of_metrics", default=[],
+                        help="Metric expression for total (raw value) chart (can be specified multiple times, e.g., --total-of='bytes_sent')")
+    parser.add_argument("--gauge-of", action="append", dest="gauge_of_metrics", default=[],
+                        help="Metric expression for a raw value chart with no run total, for gauges and quantiles "
+                             "(can be specified multiple times, e.g., --gauge-of='kafka_consumer_lag')")
+    parser.add_argument("--output", required=True, help="Output HTML file path")
+    parser.add_argument("--title", default="Performance Test Report", help="Report title")
+    parser.add_argument("--step", type=int, default=30, help="Query step in seconds")
+    parser.add_argument("--query-workers", type=int, default=8, help="Number of queries to run concurrently")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Directory of the on-disk query cache")
+    parser.add_argument("--no-cache", action="store_true", help="Always query Prometheus, bypassing the cache")
+    parser.add_argument("--cache-max-mb", type=int, default=512, help="Query cache size cap (least recently used entries are evicted)")
+    parser.add_argument("--run-log", help="HammerDB run log to include in the run archive")
+    parser.add_argument("--incidents", help="Watchdog incident file (JSONL); incidents mark the run invalid")
+    parser.add_argument("--unwatched", action="store_true",
+                        help="Mark the run unwatched: the watchdog exited before the benchmark ended")
+    add_view_arguments(parser)
+
+
+def parse_report_args(parser: argparse.ArgumentParser, argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """Parse the command line, checking the options that go together."""
+    args = parser.parse_args(argv)
+    if bool(args.steady_start) != bool(args.steady_end):
+        parser.error("--steady-start and --steady-end must be given together")
+    return args
+
+
+def report_config_args(args: argparse.Namespace) -> dict:
+    """BaseReportConfig fields from the options of add_report_arguments()."""
+    return {
+        "start_time": parse_time(args.start),
+        "end_time": parse_time(args.end),
+        "step": args.step,
+        "containers": [c.strip() for c in args.containers.split(",")],
+        "rate_of_metrics": args.rate_of_metrics,
+        "total_of_metrics": args.total_of_metrics,
+        "gauge_of_metrics": args.gauge_of_metrics,
+        "title": args.title,
+        "query_workers": args.query_workers,
+        "cache_dir": None if args.no_cache else args.cache_dir,
+        "cache_max_mb": args.cache_max_mb,
+        "steady_state": not args.no_steady_state,
+        "max_points": args.max_points,
+        "full_resolution": args.full_resolution,
+        "pipeline_window": args.pipeline_window,
+        "incidents": args.incidents,
+        "unwatched": args.unwatched,
+        "steady_start": parse_time(args.steady_start) if args.steady_start else None,
+        "steady_end": parse_time(args.steady_end) if args.steady_end else None,
+    }
+
+
+def render_main(argv: list[str], config_class: type, generator_class: type):
+    """Rebuild a report from a run archive, without querying Prometheus."""
+    parser = argparse.ArgumentParser(prog=f"{generator_class.name}.py render",
+                                     description="Rebuild a report from its run archive (report.npz)")
+    parser.add_argument("--from-archive", required=True, help="Run archive written next to a report")
+    parser.add_argument("--output", required=True, help="Output HTML file path")
+    parser.add_argument("--title", help="Report title (default: the archived title)")
+    add_view_arguments(parser)
+    args = parse_report_args(parser, argv)
+
+    try:
+        meta, responses, _ = load_archive(Path(args.from_archive))
+    except (OSError, ValueError) as e:
+        print(f"Cannot load archive: {e}", file=sys.stderr)
+        sys.exit(1)
+    if meta["generator"] != generator_class.name:
+        print(f"Warning: archive was written by {meta['generator']}.py", file=sys.stderr)
+
+    overrides = {
+        "cache_dir": None,
+        "incidents": None,  # archived below
+        "max_points": args.max_points,
+        "full_resolution": args.full_resolution,
+        "pipeline_window": args.pipeline_window,
+    }
+    if args.title:
+        overrides["title"] = args.title
+    if args.no_steady_state:
+        overrides["steady_state"] = False
+    if args.steady_start:
+        overrides["steady_state"] = True
+        overrides["steady_start"] = parse_time(args.steady_start)
+        overrides["steady_end"] = parse_time(args.steady_end)
+    config = config_from_dict(config_class, meta["config"], **overrides)
+
+    generator = generator_class(config, ArchiveExecutor(responses))
+    generator.incidents = meta.get("incidents", [])
+    data = generator.generate()
+
+    output_path = Path(args.output)
+    render_report(data, TEMPLATE_DIR, output_path)
+    save_run(output_path.with_suffix(".json"), config, data, generator.series)
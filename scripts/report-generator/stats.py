@@ -0,0 +1,130 @@
+"""
+Vectorized summary statistics for report time series.
+
+Samples come from Prometheus range queries on a fixed step. NaN samples
+and samples Prometheus did not return are treated as missing: they are
+left out of percentiles, and neither means nor integrals are carried
+across them.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# Neighbouring samples further apart than this many steps straddle a gap
+GAP_STEPS = 1.5
+
+
+@dataclass
+class SeriesStats:
+    """Summary of one time series."""
+    min: float
+    max: float
+    mean: float  # time-weighted over the covered time
+    p50: float
+    p95: float
+    p99: float
+    integral: float  # trapezoidal, over the covered time (value × seconds)
+    delta: float  # max - min, for counters and other raw totals
+    samples: int
+    covered_seconds: float
+
+
+def summarize(timestamps, values, step: float) -> Optional[SeriesStats]:
+    """Summarize a series; None if it has no usable samples."""
+    ts = np.asarray(timestamps, dtype=float)
+    v = np.asarray(values, dtype=float)
+    finite = np.isfinite(v)
+    if not finite.any():
+        return None
+    ts, v = ts[finite], v[finite]
+
+    dt = np.diff(ts)
+    joined = dt <= step * GAP_STEPS
+    integral = float(np.sum((v[1:] + v[:-1])[joined] * dt[joined]) / 2)
+    covered = float(np.sum(dt[joined]))
+    mean = integral / covered if covered > 0 else float(np.mean(v))
+    p50, p95, p99 = np.percentile(v, [50, 95, 99])
+
+    return SeriesStats(
+        min=float(v.min()),
+        max=float(v.max()),
+        mean=mean,
+        p50=float(p50),
+        p95=float(p95),
+        p99=float(p99),
+        integral=integral,
+        delta=float(v.max() - v.min()),
+        samples=int(v.size),
+        covered_seconds=covered,
+    )
+
+
+def in_window(timestamps, values, window: Optional[tuple[float, float]]):
+    """Restrict a series to the samples inside window (start, end), inclusive."""
+    ts = np.asarray(timestamps, dtype=float)
+    v = np.asarray(values, dtype=float)
+    if window is None:
+        return ts, v
+    mask = (ts >= window[0]) & (ts <= window[1])
+    return ts[mask], v[mask]
+
+
+def chart_values(values, digits: int) -> list:
+    """Round values for a chart; missing samples become null (a gap in the line)."""
+    v = np.round(np.asarray(values, dtype=float), digits)
+    out = v.astype(object)
+    out[~np.isfinite(v)] = None
+    return out.tolist()
+
+
+def _rolling_median(v: np.ndarray, window: int) -> np.ndarray:
+    half = window // 2
+    padded = np.pad(v, half, mode="edge")
+    return np.median(np.lib.stride_tricks.sliding_window_view(padded, window), axis=1)
+
+
+def detect_steady_state(timestamps, values, step: float, min_seconds: float = 60,
+                        tolerance: float = 0.2) -> Optional[tuple[float, float]]:
+    """Find the throughput plateau of a rate series, excluding rampup and drain.
+
+    The series is smoothed with a rolling median over about a minute. The
+    plateau level is the median of the samples above half the peak, and
+    the steady state is the longest run of samples within tolerance of
+    that level, trimmed by half a smoothing window at each end. Returns
+    (start, end) timestamps, or None if no plateau of min_seconds exists.
+    """
+    ts = np.asarray(timestamps, dtype=float)
+    v = np.asarray(values, dtype=float)
+    finite = np.isfinite(v)
+    ts, v = ts[finite], v[finite]
+    if v.size < 3:
+        return None
+
+    window = max(3, int(round(60 / step)) | 1)
+    window = min(window, v.size if v.size % 2 else v.size - 1)
+    smoothed = _rolling_median(v, window)
+
+    peak = np.percentile(smoothed, 95)
+    if peak <= 0:
+        return None
+    level = np.median(smoothed[smoothed >= 0.5 * peak])
+    inside = np.abs(smoothed - level) <= tolerance * level
+
+    # Longest run of consecutive samples on the plateau
+    edges = np.diff(np.concatenate(([0], inside.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    if starts.size == 0:
+        return None
+    longest = np.argmax(ends - starts)
+    first, last = int(starts[longest]), int(ends[longest])
+
+    # The median window smears the ramp edges into the plateau
+    trim = window // 2
+    if last - first > 2 * trim:
+        first, last = first + trim, last - trim
+    if ts[last] - ts[first] < min_seconds:
+        return None
+    return float(ts[first]), float(ts[last])
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Live watchdog for OLR/Debezium stalls (see KNOWN_ISSUES.md).
+
+Polls Prometheus every few seconds and checks a set of rules. A rule
+breached for its `for_seconds` opens an incident, written to a JSONL file
+(see incidents.py); the incident ends when the rule clears. Reports
+generated with --incidents mark the run as invalid and shade the
+incidents on every chart.
+
+Rules are JSON objects; --rules loads a list of them in place of the
+defaults (--print-rules prints the defaults):
+
+    {
+      "name": "confirm-stall",
+      "query": "sum(bytes_confirmed)",       # instant query, first sample is used
+      "condition": "stalled",                # stalled | above | below
+      "threshold": 0,                        # for above/below
+      "for_seconds": 30,
+      "when": "sum(bytes_sent) - sum(bytes_confirmed)",  # optional: only checked while > 0
+      "description": "..."
+    }
+
+"stalled" holds while the value does not increase between polls.
+
+Usage:
+    python watchdog.py --incidents output/hammerdb/INCIDENTS.jsonl
+    python watchdog.py --k8s --namespace oracle-cdc --incidents output/hammerdb/INCIDENTS.jsonl
+"""
+
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from incidents import IncidentLog
+from report_common import PrometheusClient, create_executor, docker_exec_command, kubectl_exec_command
+
+DEFAULT_RULES = [
+    {
+        "name": "confirm-stall",
+        "query": "sum(bytes_confirmed)",
+        "condition": "stalled",
+        "for_seconds": 30,
+        "when": "sum(bytes_sent) - sum(bytes_confirmed)",
+        "description": "OLR bytes_confirmed stopped advancing with unconfirmed bytes outstanding "
+                       "(OLR/Debezium backpressure deadlock)",
+    },
+    {
+        "name": "confirm-gap",
+        "query": "sum(bytes_sent) - sum(bytes_confirmed)",
+        "condition": "above",
+        "threshold": 1024 ** 3,
+        "for_seconds": 60,
+        "description": "More than 1 GiB sent by OLR but not confirmed by Debezium",
+    },
+    {
+        "name": "send-stall",
+        "query": "sum(rate(messages_sent[1m]))",
+        "condition": "below",
+        "threshold": 1,
+        "for_seconds": 30,
+        "when": "sum(rate(oracledb_dml_redo_entries[1m]))",
+        "description": "OLR stopped sending messages while Oracle is generating redo",
+    },
+    {
+        "name": "checkpoint-stall",
+        "query": "max(debezium_oracle_streaming_current_scn)",
+        "condition": "stalled",
+        "for_seconds": 60,
+        "when": "sum(rate(oracledb_dml_redo_entries[1m]))",
+        "description": "Debezium's SCN stopped advancing while Oracle is generating redo",
+    },
+]
+
+CONDITIONS = ("stalled", "above", "below")
+
+
+@dataclass
+class Rule:
+    """One stall condition."""
+    name: str
+    query: str
+    condition: str
+    for_seconds: float = 30
+    threshold: float = 0
+    when: Optional[str] = None
+    description: str = ""
+
+
+@dataclass
+class RuleState:
+    since: Optional[float] = None  # when the condition started holding
+    last_value: Optional[float] = None
+    incident: bool = False
+
+
+def load_rules(path: Optional[Path]) -> list[Rule]:
+    """Rules from a JSON file, or the defaults."""
+    specs = json.loads(path.read_text()) if path else DEFAULT_RULES
+    rules = [Rule(**spec) for spec in specs]
+    for rule in rules:
+        if rule.condition not in CONDITIONS:
+            raise ValueError(f"rule {rule.name}: condition must be one of {', '.join(CONDITIONS)}")
+    return rules
+
+
+class Watchdog:
+    """Evaluates rules against Prometheus and records incidents."""
+
+    def __init__(self, client: PrometheusClient, rules: list[Rule], log: IncidentLog):
+        self.client = client
+        self.rules = rules
+        self.log = log
+        self.states = {rule.name: RuleState() for rule in rules}
+
+    def _value(self, query: str) -> Optional[float]:
+        """First sample of an instant query; None if there is none."""
+        results = self.client.query_instant(query)
+        if not results:
+            return None
+        value = float(results[0]["value"][1])
+        return None if value != value else value  # NaN
+
+    def _holds(self, rule: Rule, state: RuleState, value: Optional[float]) -> bool:
+        if value is None:
+            return False
+        if rule.when is not None:
+            gate = self._value(rule.when)
+            if gate is None or gate <= 0:
+                return False
+        if rule.condition == "stalled":
+            return state.last_value is not None and value <= state.last_value
+        if rule.condition == "above":
+            return value > rule.threshold
+        return value < rule.threshold
+
+    def check(self, now: float):
+        """Evaluate every rule once."""
+        for rule in self.rules:
+            state = self.states[rule.name]
+            value = self._value(rule.query)
+            holds = self._holds(rule, state, value)
+            if value is not None:
+                state.last_value = value
+
+            if not holds:
+                state.since = None
+                if state.incident:
+                    state.incident = False
+                    self.log.write("end", now, rule=rule.name)
+                    print(f"[{_clock(now)}] {rule.name} cleared", file=sys.stderr)
+                continue
+
+            if state.since is None:
+                state.since = now
+            if not state.incident and now - state.since >= rule.for_seconds:
+                state.incident = True
+                self.log.write("start", state.since, rule=rule.name, description=rule.description,
+                               value=value, detected_ts=now)
+                print(f"[{_clock(now)}] INCIDENT {rule.name}: {rule.description} (value {value:g})", file=sys.stderr)
+
+    def run(self, interval: float, stop: threading.Event):
+        """Check every interval seconds until stop is set."""
+        try:
+            while not stop.is_set():
+                started = time.time()
+                self.check(started)
+                stop.wait(max(0.0, interval - (time.time() - started)))
+        finally:
+            self.log.write("stop", time.time())
+
+
+def _clock(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%H:%M:%S")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Watch the CDC pipeline for stalls and record incidents")
+    parser.add_argument("--incidents", default="output/hammerdb/INCIDENTS.jsonl", help="Incident file (JSONL, appended)")
+    parser.add_argument("--rules", help="JSON file with a list of rules, replacing the defaults")
+    parser.add_argument("--print-rules", action="store_true", help="Print the default rules as JSON and exit")
+    parser.add_argument("--interval", type=float, default=5, help="Seconds between checks")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds (default: until interrupted)")
+    parser.add_argument("--backend", choices=["auto", "http", "exec"], default="auto",
+                        help="Query backend: http queries Prometheus directly (through kubectl port-forward with "
+                             "--k8s), exec runs curl in a container, auto uses http when reachable")
+    parser.add_argument("--prometheus-url", default="http://localhost:9090",
+                        help="Prometheus URL reachable from this host (Docker mode)")
+    parser.add_argument("--k8s", action="store_true", help="Use kubectl instead of docker compose")
+    parser.add_argument("--namespace", default="oracle-cdc", help="Kubernetes namespace")
+    parser.add_argument("--k8s-deployment", default="oracle-cdc-hammerdb",
+                        help="Kubernetes deployment to exec into (exec backend)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.print_rules:
+        print(json.dumps(DEFAULT_RULES, indent=2))
+        return
+
+    try:
+        rules = load_rules(Path(args.rules) if args.rules else None)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"Cannot load rules: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.k8s:
+        executor = create_executor(args.backend, kubectl_exec_command(args.namespace, args.k8s_deployment),
+                                   "http://oracle-cdc-kube-prometheus-prometheus:9090", 1, namespace=args.namespace)
+    else:
+        executor = create_executor(args.backend, docker_exec_command("hammerdb"), "http://prometheus:9090", 1,
+                                   http_url=args.prometheus_url)
+    client = PrometheusClient(executor)
+    watchdog = Watchdog(client, rules, IncidentLog(Path(args.incidents)))
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    if args.duration:
+        timer = threading.Timer(args.duration, stop.set)
+        timer.daemon = True
+        timer.start()
+
+    print(f"Watching {len(rules)} rules every {args.interval:g}s, incidents to {args.incidents}", file=sys.stderr)
+    try:
+        watchdog.run(args.interval, stop)
+    finally:
+        client.executor.close()
+
+
+if __name__ == "__main__":
+    main()